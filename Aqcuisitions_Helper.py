@@ -1,6 +1,7 @@
+import multiprocessing
 import tkinter as tk
-from tkinter import messagebox
 from multi_drive_copy_utility import MultiDriveCopyUtility  # Import the class
+from office_copy_utility import OfficeCopyUtility
 
 class DataOrganizationApp:
     def __init__(self, master):
@@ -38,9 +39,18 @@ class DataOrganizationApp:
         self.master.wait_window(field_copy_window)
 
     def office_copy(self):
-        messagebox.showinfo("Info", "Office Copy Secondary Drive functionality not implemented yet.")
+        office_copy_window = tk.Toplevel(self.master)
+        office_copy_window.title("Office Copy Secondary Drive")
+
+        OfficeCopyUtility(office_copy_window)
+
+        office_copy_window.transient(self.master)
+        office_copy_window.grab_set()
+        self.master.wait_window(office_copy_window)
 
 if __name__ == "__main__":
+    # Band splitting uses a process pool; needed for the frozen app
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = DataOrganizationApp(root)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,255 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_drives import PRESETS, DEFAULT_PRESET, generate
+from utils import band_splitter
+from utils.copy_backends import BACKEND_AUTO, COPY_BACKENDS, DEFAULT_COPY_BACKEND
+from utils.hashing import DEFAULT_HASH_ALGORITHM, available_hash_algorithms
+from utils.ingest_engine import IngestEngine, IngestOptions
+from utils.manifest import scan_drive
+from utils.resampling import KERNELS, DEFAULT_KERNEL, resample, target_size
+from utils.verification import VERIFY_LEVELS, DEFAULT_VERIFY_LEVEL, VerificationPolicy, drop_file_cache
+
+# Copy and band-split benchmark on synthetic sensor drives:
+#   python -m benchmarks.run_benchmark --preset quick --label before
+#   python -m benchmarks.run_benchmark --preset quick --label after --compare benchmarks/results/<before>.json
+# Each run is saved as JSON under benchmarks/results.
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+MB = 1024 * 1024
+# Band images timed stage by stage in this process
+PROFILE_SAMPLE = 20
+
+
+def peak_rss():
+    # Peak resident set size in bytes of this process and of its (finished)
+    # children such as the band-splitting workers; None where unsupported
+    try:
+        import resource
+    except ImportError:
+        return {'self': None, 'children': None}
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    scale = 1 if platform.system() == 'Darwin' else 1024
+    return {'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def drop_source_cache(drives):
+    # Best effort (posix_fadvise); makes the copy read from the disk rather
+    # than from the page cache filled while generating
+    for drive in drives.values():
+        for entry in scan_drive(drive):
+            drop_file_cache(os.path.join(drive, entry.rel_path))
+
+
+def run_copy(drives, dest, args):
+    shutil.rmtree(dest, ignore_errors=True)
+    if args.cold:
+        drop_source_cache(drives)
+    options = IngestOptions(concurrent=not args.sequential,
+                            verification_policy=VerificationPolicy(args.verify, args.hash, args.defer_verify),
+                            split_bands=False,
+                            max_small_file_workers=args.small_file_workers,
+                            copy_backend=args.copy_backend)
+    engine = IngestEngine(options)
+    start_time = time.perf_counter()
+    drive_stats = engine.run(drives, dest)
+    elapsed = time.perf_counter() - start_time
+    copied_size = sum(stats['copied_size'] for stats in drive_stats.values())
+    copied_files = sum(stats['copied_files'] for stats in drive_stats.values())
+    return {
+        'elapsed': elapsed,
+        'bytes': copied_size,
+        'files': copied_files,
+        'mb_per_s': copied_size / MB / elapsed if elapsed > 0 else 0,
+        'files_per_s': copied_files / elapsed if elapsed > 0 else 0,
+        'stage_times': engine.stage_times,
+        'bottleneck': engine.report['bottleneck'],
+        'backend_probes': engine.report['backend_probes'],
+        'drives': drive_stats,
+    }
+
+
+def profile_band_images(altum_folder, kernel, bands, sizes, limit=PROFILE_SAMPLE):
+    # Decode / resample / encode times per band image, measured in this
+    # process on a sample; the pool run below only gives the total
+    captures = band_splitter.find_captures(altum_folder, bands)
+    paths = sorted(path for files in captures.values() for band, path in files)[:limit]
+    times = {'decode': [], 'resample': [], 'encode': []}
+    for path in paths:
+        start_time = time.perf_counter()
+        with Image.open(path) as img:
+            img.load()
+            decoded = time.perf_counter()
+            levels = []
+            level = img
+            for size in sorted(set(sizes), reverse=True):
+                level = resample(level, target_size(img.size[0], img.size[1], size), kernel)
+                levels.append(level)
+            resampled = time.perf_counter()
+            for level in levels:
+                level.save(io.BytesIO(), format='TIFF')
+            encoded = time.perf_counter()
+        times['decode'].append(decoded - start_time)
+        times['resample'].append(resampled - decoded)
+        times['encode'].append(encoded - resampled)
+    return {stage: statistics.mean(values) if values else 0.0 for stage, values in times.items()}
+
+
+def run_band_split(altum_folder, args):
+    for folder in band_splitter.output_folders(altum_folder, args.bands, args.sizes):
+        shutil.rmtree(folder, ignore_errors=True)
+    start_time = time.perf_counter()
+    # process_images prints a line per image
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = band_splitter.process_images(altum_folder, workers=args.workers, kernel=args.kernel,
+                                             bands=args.bands, sizes=args.sizes, use_cache=False)
+    elapsed = time.perf_counter() - start_time
+    per_image = profile_band_images(altum_folder, args.kernel, args.bands, args.sizes)
+    return {
+        'elapsed': elapsed,
+        'images': stats['processed'],
+        'errors': stats['errors'],
+        'workers': stats['workers'],
+        'images_per_s': stats['processed'] / elapsed if elapsed > 0 else 0,
+        'per_image': per_image,
+        # Estimated from the sample: total CPU time spent resampling
+        'resample_time': per_image['resample'] * stats['processed'],
+    }
+
+
+def best_run(runs, key):
+    return min(runs, key=lambda run: run[key]) if runs else None
+
+
+def compare(result, baseline):
+    rows = [
+        ('copy MB/s', ('copy', 'best', 'mb_per_s'), True),
+        ('copy files/s', ('copy', 'best', 'files_per_s'), True),
+        ('copy elapsed s', ('copy', 'best', 'elapsed'), False),
+        ('band images/s', ('band_split', 'best', 'images_per_s'), True),
+        ('band elapsed s', ('band_split', 'best', 'elapsed'), False),
+        ('peak RSS MB', ('peak_rss', 'self'), False),
+        ('worker RSS MB', ('peak_rss', 'children'), False),
+    ]
+    print(f"\nCompared with {baseline.get('label')} ({baseline.get('commit')}):")
+    for name, path, higher_is_better in rows:
+        new, old = result, baseline
+        for key in path:
+            new = new.get(key) if isinstance(new, dict) else None
+            old = old.get(key) if isinstance(old, dict) else None
+        if new is None or old is None:
+            continue
+        if 'RSS' in name:
+            new, old = new / MB, old / MB
+        change = (new - old) / old * 100 if old else 0.0
+        verdict = ''
+        if abs(change) >= 1:
+            verdict = 'better' if (change > 0) == higher_is_better else 'worse'
+        print(f"  {name:16} {old:10.2f} -> {new:10.2f}  {change:+6.1f}% {verdict}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark copying and band splitting on synthetic drives.")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default=DEFAULT_PRESET)
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'acquisition_benchmark'),
+                        help="Where the synthetic drives and the copy destination live")
+    parser.add_argument('--label', default='run', help="Name stored with the results")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--cold', action='store_true', help="Drop the source files from the page cache before each copy")
+    parser.add_argument('--sequential', action='store_true', help="Copy one drive after the other")
+    parser.add_argument('--copy-backend', choices=(BACKEND_AUTO,) + COPY_BACKENDS, default=DEFAULT_COPY_BACKEND)
+    parser.add_argument('--verify', choices=VERIFY_LEVELS, default=DEFAULT_VERIFY_LEVEL)
+    parser.add_argument('--hash', choices=available_hash_algorithms(), default=DEFAULT_HASH_ALGORITHM)
+    parser.add_argument('--defer-verify', action='store_true')
+    parser.add_argument('--small-file-workers', type=int, default=IngestOptions().max_small_file_workers)
+    parser.add_argument('--kernel', choices=KERNELS, default=DEFAULT_KERNEL)
+    parser.add_argument('--bands', type=int, nargs='+', default=list(band_splitter.DEFAULT_BANDS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(band_splitter.DEFAULT_SIZES))
+    parser.add_argument('--workers', type=int, help="Band-splitting processes (default: all cores)")
+    parser.add_argument('--skip-copy', action='store_true')
+    parser.add_argument('--skip-bands', action='store_true')
+    parser.add_argument('--output-dir', default=RESULTS_DIR)
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    drives = generate(args.work_dir, args.preset)
+    dest = os.path.join(args.work_dir, 'dest')
+    result = {
+        'label': args.label,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'preset': args.preset,
+        'params': {key: value for key, value in vars(args).items()
+                   if key not in ('work_dir', 'output_dir', 'compare', 'label')},
+    }
+
+    if not args.skip_copy:
+        runs = []
+        for i in range(args.repeat):
+            run = run_copy(drives, dest, args)
+            runs.append(run)
+            print(f"copy run {i + 1}: {run['elapsed']:.2f}s, {run['mb_per_s']:.1f} MB/s, "
+                  f"{run['files_per_s']:.1f} files/s, stages "
+                  + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in run['stage_times'].items()))
+        result['copy'] = {'runs': runs, 'best': best_run(runs, 'elapsed')}
+
+    if not args.skip_bands:
+        altum_folder = os.path.join(dest, 'Altum')
+        if not os.path.isdir(altum_folder):
+            shutil.copytree(drives['Altum'], altum_folder)
+        runs = []
+        for i in range(args.repeat):
+            run = run_band_split(altum_folder, args)
+            runs.append(run)
+            print(f"band split run {i + 1}: {run['elapsed']:.2f}s, {run['images_per_s']:.1f} images/s "
+                  f"({run['workers']} workers), per image "
+                  + ", ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in run['per_image'].items()))
+        result['band_split'] = {'runs': runs, 'best': best_run(runs, 'elapsed')}
+
+    result['peak_rss'] = peak_rss()
+    rss = result['peak_rss']
+    if rss['self'] is not None:
+        print(f"peak RSS: {rss['self'] / MB:.1f} MB (workers {rss['children'] / MB:.1f} MB)")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"{datetime.now():%Y%m%d_%H%M%S}_{args.label}.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results saved to {output_path}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
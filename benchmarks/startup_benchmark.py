@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Startup-time guard for the main menu: imports each window module in a
+# fresh interpreter, reports the import time and fails when it is over
+# budget or when a heavy dependency was loaded before it is needed:
+#   python -m benchmarks.startup_benchmark
+#   python -m benchmarks.startup_benchmark --budget 0.5
+# Exits with 1 when a check fails, so it can run in CI.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ('Aqcuisitions_Helper', 'multi_drive_copy_utility', 'office_copy_utility', 'ingest_cli')
+# Only needed once band images are split (or, for win32file, never)
+HEAVY_MODULES = ('numpy', 'PIL', 'scipy', 'win32file')
+DEFAULT_BUDGET = 1.0
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module, repeat):
+    # Best of repeat fresh interpreters, so a cold disk cache on the first
+    # run does not count
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result['elapsed'] < best['elapsed']:
+            best = result
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check how long the window modules take to import.")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help="Seconds allowed per module")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('modules', nargs='*', default=list(MODULES))
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules:
+        try:
+            result = measure(module, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{module}: import failed\n{e.stderr}")
+            failed = True
+            continue
+        problems = []
+        if result['elapsed'] > args.budget:
+            problems.append(f"over the {args.budget:.2f}s budget")
+        if result['heavy']:
+            problems.append(f"loads {', '.join(result['heavy'])}")
+        print(f"{module:28} {result['elapsed'] * 1000:7.1f} ms  {'; '.join(problems) or 'ok'}")
+        failed = failed or bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import json
+import os
+import shutil
+import numpy as np
+from PIL import Image
+
+# Synthetic source drives shaped like the field drives:
+#   LiDAR  DCIM/DCIMA/*.AVI        a few large video files
+#   Altum  SYNCxxxxSET/000/IMG_xxxx_N.tif   16-bit band captures
+#   Sony   DCIM/100MSDCF/*.JPG, *.ARW
+# File contents are random (or, for the Altum bands, a smooth field plus
+# noise) so neither compression nor deduplication can flatter the numbers.
+# The Altum captures default to 960x720, which gives the ~1.3 MB files seen
+# in copy_log.txt.
+PRESETS = {
+    'quick': {
+        'lidar_files': 1, 'lidar_size': 128 * 1024 * 1024,
+        'altum_captures': 40, 'altum_bands': 5, 'altum_width': 960, 'altum_height': 720,
+        'sony_jpg_files': 8, 'sony_jpg_size': 4 * 1024 * 1024,
+        'sony_raw_files': 4, 'sony_raw_size': 12 * 1024 * 1024,
+    },
+    'full': {
+        'lidar_files': 3, 'lidar_size': 2 * 1024 * 1024 * 1024,
+        'altum_captures': 360, 'altum_bands': 5, 'altum_width': 960, 'altum_height': 720,
+        'sony_jpg_files': 200, 'sony_jpg_size': 10 * 1024 * 1024,
+        'sony_raw_files': 100, 'sony_raw_size': 24 * 1024 * 1024,
+    },
+}
+DEFAULT_PRESET = 'quick'
+
+# Written last, so an interrupted generation is redone on the next run
+TREE_FILENAME = 'benchmark_tree.json'
+CAPTURES_PER_SET = 200
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def write_random_file(path, size, rng):
+    # One random block, re-stamped with its offset, keeps generation fast
+    # without producing identical blocks
+    block = bytearray(rng.bytes(min(BLOCK_SIZE, size)))
+    with open(path, 'wb') as f:
+        written = 0
+        while written < size:
+            block[:8] = written.to_bytes(8, 'little')
+            chunk = block[:min(len(block), size - written)]
+            f.write(chunk)
+            written += len(chunk)
+
+
+def band_image(width, height, capture, band, rng):
+    y, x = np.mgrid[0:height, 0:width]
+    field = 20000 + 8000 * np.sin(x / (37.0 + capture % 11)) * np.cos(y / (53.0 + band))
+    noise = rng.normal(0, 400, size=(height, width))
+    return Image.fromarray(np.clip(field + noise, 0, 65535).astype(np.uint16))
+
+
+def make_lidar(root, params, rng):
+    folder = os.path.join(root, 'DCIM', 'DCIMA')
+    os.makedirs(folder, exist_ok=True)
+    for i in range(params['lidar_files']):
+        write_random_file(os.path.join(folder, f"DJI_{i + 1:04d}.AVI"), params['lidar_size'], rng)
+
+
+def make_altum(root, params, rng):
+    for capture in range(params['altum_captures']):
+        folder = os.path.join(root, f"SYNC{capture // CAPTURES_PER_SET + 1:04d}SET", "000")
+        os.makedirs(folder, exist_ok=True)
+        for band in range(1, params['altum_bands'] + 1):
+            img = band_image(params['altum_width'], params['altum_height'], capture, band, rng)
+            img.save(os.path.join(folder, f"IMG_{capture:04d}_{band}.tif"), format='TIFF')
+
+
+def make_sony(root, params, rng):
+    folder = os.path.join(root, 'DCIM', '100MSDCF')
+    os.makedirs(folder, exist_ok=True)
+    for i in range(params['sony_jpg_files']):
+        write_random_file(os.path.join(folder, f"DSC{i:05d}.JPG"), params['sony_jpg_size'], rng)
+    for i in range(params['sony_raw_files']):
+        write_random_file(os.path.join(folder, f"DSC{i:05d}.ARW"), params['sony_raw_size'], rng)
+
+
+def source_drives(work_dir):
+    return {name: os.path.join(work_dir, 'drives', name) for name in ('LiDAR', 'Altum', 'Sony')}
+
+
+def generate(work_dir, preset=DEFAULT_PRESET, seed=0):
+    # Returns {drive_name: path}; an existing tree with the same parameters
+    # is reused
+    params = dict(PRESETS[preset], seed=seed)
+    drives = source_drives(work_dir)
+    tree_path = os.path.join(work_dir, TREE_FILENAME)
+    if os.path.exists(tree_path):
+        with open(tree_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == params:
+                return drives
+
+    shutil.rmtree(os.path.join(work_dir, 'drives'), ignore_errors=True)
+    if os.path.exists(tree_path):
+        os.remove(tree_path)
+    rng = np.random.default_rng(seed)
+    print(f"Generating '{preset}' drives in {work_dir}...")
+    make_lidar(drives['LiDAR'], params, rng)
+    make_altum(drives['Altum'], params, rng)
+    make_sony(drives['Sony'], params, rng)
+    with open(tree_path, 'w', encoding='utf-8') as f:
+        json.dump(params, f)
+    return drives
@@ -0,0 +1,173 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from utils.band_splitter import DEFAULT_BANDS, DEFAULT_SIZES
+from utils.drive_wipe import DriveWiper, format_wipe_report
+from utils.copy_backends import BACKEND_AUTO, COPY_BACKENDS, DEFAULT_COPY_BACKEND
+from utils.hashing import DEFAULT_HASH_ALGORITHM, available_hash_algorithms
+from utils.run_log import format_report
+from utils.verification import VERIFY_LEVELS, DEFAULT_VERIFY_LEVEL, VerificationPolicy
+from utils.ingest_engine import (EVENT_STATUS, EVENT_PROGRESS, EVENT_WARNING, EVENT_DRIVE_DONE,
+                                 MAX_CONCURRENT_WRITES, MAX_SMALL_FILE_WORKERS, IngestEngine, IngestOptions,
+                                 format_size, format_time, next_mission_folder)
+
+# Command-line counterpart of the Field Copy window, for scripted ingests:
+#   python ingest_cli.py --altum /media/ALTUM --sony /media/SONY --dest /data/Missions --new-mission
+# --also-copy-to writes the same mission to further drives from a single
+# read of each source file.
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 1.0
+
+
+class ConsoleReporter:
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.last_progress = 0.0
+
+    def __call__(self, event, data):
+        if event == EVENT_WARNING:
+            print(f"WARNING: {data['message']}", file=sys.stderr)
+        elif self.quiet:
+            return
+        elif event == EVENT_STATUS:
+            # Per-file status lines would flood the terminal
+            if not data['message'].startswith(("Copying: ", "Verifying: ")):
+                print(data['message'], file=sys.stderr)
+        elif event == EVENT_PROGRESS:
+            now = time.time()
+            if now - self.last_progress < PROGRESS_INTERVAL and data['percent'] < 100:
+                return
+            self.last_progress = now
+            if 'files_total' in data:
+                print(f"{data['percent']:5.1f}%  {data['operation']}: {data['files_done']} / {data['files_total']}",
+                      file=sys.stderr)
+            elif data.get('speed') is not None:
+                print(f"{data['percent']:5.1f}%  {data['operation']}: "
+                      f"{format_size(data['copied_size'])} / {format_size(data['total_size'])}  "
+                      f"{format_size(data['speed'])}/s  ETA {format_time(data['eta'])}", file=sys.stderr)
+        elif event == EVENT_DRIVE_DONE:
+            stats = data['stats']
+            print(f"{data['drive']}: {stats['copied_files']}/{stats['total_files']} files, "
+                  f"{format_size(stats['copied_size'])}", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Copy sensor drives into a mission folder without the GUI.")
+    parser.add_argument('--lidar', help="LiDAR drive or folder")
+    parser.add_argument('--altum', help="Altum drive or folder")
+    parser.add_argument('--sony', help="Sony drive or folder")
+    parser.add_argument('--dest', required=True, help="Mission folder to copy into")
+    parser.add_argument('--new-mission', action='store_true',
+                        help="Create the next Mission_N folder inside --dest and copy into that")
+    parser.add_argument('--also-copy-to', action='append', default=[], metavar='DIR',
+                        help="Also copy into this folder (repeatable); gets the same mission folder name "
+                             "when --new-mission is given")
+    parser.add_argument('--sequential', action='store_true', help="Copy one drive after the other")
+    parser.add_argument('--max-writes', type=int, default=MAX_CONCURRENT_WRITES,
+                        help="Files written to the destination at the same time on top of the one each "
+                             "drive always writes")
+    parser.add_argument('--small-file-workers', type=int, default=MAX_SMALL_FILE_WORKERS,
+                        help="Upper limit for copying small files in parallel within a drive (1 disables it)")
+    parser.add_argument('--copy-backend', choices=(BACKEND_AUTO,) + COPY_BACKENDS, default=DEFAULT_COPY_BACKEND,
+                        help="How files are copied; auto probes each source/destination pair")
+    parser.add_argument('--verify', choices=VERIFY_LEVELS, default=DEFAULT_VERIFY_LEVEL)
+    parser.add_argument('--hash', choices=available_hash_algorithms(), default=DEFAULT_HASH_ALGORITHM)
+    parser.add_argument('--defer-verify', action='store_true', help="Verify after copying (re-read from disk)")
+    parser.add_argument('--dedup', action='store_true', help="Link files already copied for earlier missions")
+    parser.add_argument('--no-split-bands', action='store_true', help="Do not split the Altum band images")
+    parser.add_argument('--bands', type=int, nargs='+', default=list(DEFAULT_BANDS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--empty-drives', action='store_true',
+                        help="After a copy without failures, delete the verified files from the source drives "
+                             "(CONFIG files are kept)")
+    parser.add_argument('--log-file', default='copy_log.txt')
+    parser.add_argument('--quiet', action='store_true', help="Only print warnings and the summary")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(filename=args.log_file, level=logging.DEBUG,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    source_drives = {"LiDAR": args.lidar, "Altum": args.altum, "Sony": args.sony}
+    if not any(source_drives.values()):
+        print("No source drives given.", file=sys.stderr)
+        return 2
+    for name, path in source_drives.items():
+        if path and not os.path.isdir(path):
+            print(f"{name} source not found: {path}", file=sys.stderr)
+            return 2
+
+    policy = VerificationPolicy(args.verify, args.hash, args.defer_verify)
+    if args.empty_drives and not policy.confirms_copies:
+        print("--empty-drives needs the copies read back; use --verify sampled or --verify full.", file=sys.stderr)
+        return 2
+
+    destination = next_mission_folder(args.dest) if args.new_mission else args.dest
+    destinations = [destination]
+    for root in args.also_copy_to:
+        destinations.append(os.path.join(root, os.path.basename(destination)) if args.new_mission else root)
+    options = IngestOptions(concurrent=not args.sequential,
+                            max_concurrent_writes=args.max_writes,
+                            verification_policy=policy,
+                            deduplicate=args.dedup,
+                            split_bands=not args.no_split_bands,
+                            band_split_bands=args.bands,
+                            band_split_sizes=args.sizes,
+                            max_small_file_workers=args.small_file_workers,
+                            copy_backend=args.copy_backend)
+    engine = IngestEngine(options, on_event=ConsoleReporter(args.quiet))
+
+    # Ctrl+C cancels like the Cancel button; anything already verified is
+    # in the mission manifest, so rerunning the same command resumes
+    signal.signal(signal.SIGINT, lambda signum, frame: engine.cancel())
+    print(f"Copying into {', '.join(destinations)}", file=sys.stderr)
+    statistics = engine.run(source_drives, destinations)
+    if statistics is None:
+        print("Copy process cancelled.", file=sys.stderr)
+        return 130
+
+    failed = 0
+    for drive, stats in statistics.items():
+        print(f"{drive}: {stats['copied_files']}/{stats['total_files']} files, "
+              f"{format_size(stats['copied_size'])}/{format_size(stats['total_size'])}"
+              + (f", {stats['skipped_files']} already copied earlier" if stats.get('skipped_files') else ""))
+        failed += stats['total_files'] - stats['copied_files']
+    failed += len(engine.manifests) - len(statistics)
+    if len(destinations) > 1:
+        for root, stats in engine.destination_stats().items():
+            print(f"{root}: {stats['copied_files']} copied ({format_size(stats['copied_size'])}), "
+                  f"{stats['skipped_files']} already there, {stats['failed_files']} failed")
+            failed += stats['failed_files']
+    if engine.report is not None and not args.quiet:
+        print("\n".join(format_report(engine.report)))
+    if engine.band_stats is not None:
+        print(f"Band splitting: {engine.band_stats['processed']} processed, {engine.band_stats['cached']} unchanged, "
+              f"{engine.band_stats['errors']} errors")
+    if failed:
+        if args.empty_drives:
+            print("Not emptying the drives: some files failed to copy.", file=sys.stderr)
+        return 1
+    if args.empty_drives:
+        wiper = DriveWiper(on_event=ConsoleReporter(args.quiet))
+        signal.signal(signal.SIGINT, lambda signum, frame: wiper.cancel())
+        reports = wiper.run([(name, engine.manifests[name], engine.verified_paths(name)) for name in statistics])
+        for report in reports:
+            print("\n".join(format_wipe_report(report)))
+        if wiper.cancel_flag:
+            return 130
+        if any(report['changed'] or report['failed'] for report in reports):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # Band splitting uses a process pool; needed for frozen builds
+    multiprocessing.freeze_support()
+    sys.exit(main())
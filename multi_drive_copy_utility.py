@@ -1,36 +1,58 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-import shutil
 import json
-import platform
-import hashlib
 import threading
-import time
 import logging
 import utils.band_splitter as band_splitter
-import win32file
+from utils.progress_bus import ProgressBus
+from utils.drives import DriveMonitor
+from utils.drive_wipe import DriveWiper, format_wipe_report
+from utils.copy_backends import DEFAULT_COPY_BACKEND
+from utils.run_log import STAGE_LABELS
+from utils.hashing import DEFAULT_HASH_ALGORITHM, available_hash_algorithms
+from utils.verification import VERIFY_LEVELS, DEFAULT_VERIFY_LEVEL, VerificationPolicy
+from utils.ingest_engine import (EVENT_STATUS, EVENT_PROGRESS, EVENT_WARNING, EVENT_COMPLETE,
+                                 MAX_CONCURRENT_WRITES, MAX_SMALL_FILE_WORKERS, SMALL_FILE_SIZE,
+                                 IngestEngine, IngestOptions,
+                                 format_size, format_time, next_mission_folder)
+
+# How often the window applies the progress published by the copy threads
+UI_TICK_MS = 200
+# How often the drive dropdowns check for drives being plugged in
+DRIVE_POLL_MS = 2000
 
 
 class MultiDriveCopyUtility:
     def __init__(self, master):
         self.master = master
         self.master.title("Multi-Drive Copy Utility")
-        self.master.geometry("600x500")  # Increased height for additional info
+        self.master.geometry("600x640")  # Increased height for additional info
 
         self.config_file = "app_config.json"
         self.config = self.load_config()
 
-        self.cancel_flag = False
+        self.engine = None
+        self.progress_bus = None
+        self.copy_error = None
+        self.wiper = None
+        self.drive_monitor = DriveMonitor()
+
+        self.split_bands_var = tk.BooleanVar(value=True)  # Default to checked
+        self.split_bands_checkbox = None  # We'll create this later
+        self.concurrent_var = tk.BooleanVar(value=self.config.get('concurrent_copy', True))
+        self.hash_algorithm_var = tk.StringVar(value=self.config.get('hash_algorithm', DEFAULT_HASH_ALGORITHM))
+        self.verify_level_var = tk.StringVar(value=self.config.get('verify_level', DEFAULT_VERIFY_LEVEL))
+        self.defer_verify_var = tk.BooleanVar(value=self.config.get('defer_verify', False))
+        self.dedup_var = tk.BooleanVar(value=self.config.get('deduplicate', False))
+        self.verification_policy = None
+
         self.create_widgets()
         
         # Add this at the beginning of your script, after the imports
         logging.basicConfig(filename='copy_log.txt', level=logging.DEBUG, 
                     format='%(asctime)s - %(levelname)s - %(message)s')
         
-        self.split_bands_var = tk.BooleanVar(value=True)  # Default to checked
-        self.split_bands_checkbox = None  # We'll create this later
-        
     def create_widgets(self):
         # Drive selection
         tk.Label(self.master, text="Select Drives:").grid(row=0, column=0, padx=10, pady=10, sticky="w")
@@ -60,12 +82,38 @@ class MultiDriveCopyUtility:
         self.dest_folder_dropdown.set("Select or enter destination folder")
         tk.Button(self.master, text="Browse", command=self.browse_destination).grid(row=4, column=2, padx=10, pady=10)
 
+        # Optional second copy, written from the same read of each source file
+        tk.Label(self.master, text="Backup Folder:").grid(row=5, column=0, padx=10, pady=5, sticky="w")
+        self.backup_folder_var = tk.StringVar(value=self.config.get('backup_folder', ''))
+        self.backup_folder_entry = tk.Entry(self.master, textvariable=self.backup_folder_var, width=43)
+        self.backup_folder_entry.grid(row=5, column=1, padx=10, pady=5)
+        self.backup_browse_button = tk.Button(self.master, text="Browse", command=self.browse_backup)
+        self.backup_browse_button.grid(row=5, column=2, padx=10, pady=5)
+
+        # Copy options
+        self.options_frame = ttk.LabelFrame(self.master, text="Options")
+        self.options_frame.grid(row=6, column=0, columnspan=3, padx=10, pady=5, sticky="ew")
+        tk.Checkbutton(self.options_frame, text="Copy drives at the same time",
+                       variable=self.concurrent_var).grid(row=0, column=0, columnspan=2, padx=10, sticky="w")
+        tk.Label(self.options_frame, text="Verify:").grid(row=1, column=0, padx=10, pady=2, sticky="w")
+        self.verify_level_dropdown = ttk.Combobox(self.options_frame, textvariable=self.verify_level_var,
+                                                  values=VERIFY_LEVELS, state="readonly", width=12)
+        self.verify_level_dropdown.grid(row=1, column=1, padx=5, pady=2, sticky="w")
+        tk.Label(self.options_frame, text="Hash:").grid(row=1, column=2, padx=10, pady=2, sticky="w")
+        self.hash_algorithm_dropdown = ttk.Combobox(self.options_frame, textvariable=self.hash_algorithm_var,
+                                                    values=available_hash_algorithms(), state="readonly", width=10)
+        self.hash_algorithm_dropdown.grid(row=1, column=3, padx=5, pady=2, sticky="w")
+        tk.Checkbutton(self.options_frame, text="Verify after copying (re-read from disk)",
+                       variable=self.defer_verify_var).grid(row=2, column=0, columnspan=4, padx=10, sticky="w")
+        tk.Checkbutton(self.options_frame, text="Link files already copied for earlier missions",
+                       variable=self.dedup_var).grid(row=3, column=0, columnspan=4, padx=10, sticky="w")
+
         # Copy button
-        tk.Button(self.master, text="Copy Files", command=self.start_copy_process).grid(row=5, column=1, pady=20)
+        tk.Button(self.master, text="Copy Files", command=self.start_copy_process).grid(row=7, column=1, pady=20)
 
         # Progress information
         self.progress_frame = ttk.LabelFrame(self.master, text="Progress")
-        self.progress_frame.grid(row=6, column=0, columnspan=3, padx=10, pady=10, sticky="nsew")
+        self.progress_frame.grid(row=8, column=0, columnspan=3, padx=10, pady=10, sticky="nsew")
 
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(self.progress_frame, variable=self.progress_var, maximum=100)
@@ -94,10 +142,11 @@ class MultiDriveCopyUtility:
         self.cancel_button = tk.Button(self.progress_frame, text="Cancel", command=self.cancel_copy, state=tk.DISABLED)
         self.cancel_button.grid(row=6, column=0, columnspan=2, pady=10)
 
-        self.master.grid_rowconfigure(6, weight=1)
+        self.master.grid_rowconfigure(8, weight=1)
         self.master.grid_columnconfigure(1, weight=1)
 
         self.update_drive_list()
+        self.master.after(DRIVE_POLL_MS, self.poll_drives)
         
         self.altum_var.trace("w", self.toggle_split_bands_checkbox)
         self.toggle_split_bands_checkbox()  # Initialize checkbox state
@@ -122,46 +171,29 @@ class MultiDriveCopyUtility:
             dropdown['values'] = drives
 
     def get_removable_drives(self):
-        if platform.system() == 'Darwin':  # macOS
-            return self.get_mac_removable_drives()
-        elif platform.system() == 'Windows':
-            return self.get_windows_removable_drives()
-        else:
-            return []  # For other operating systems
-
-    def get_mac_removable_drives(self):
-        drives = []
-        volumes_path = '/Volumes'
-        for volume in os.listdir(volumes_path):
-            if volume != 'Macintosh HD':  # Exclude the main drive
-                drives.append(os.path.join(volumes_path, volume))
-        return drives
-
-    def get_windows_removable_drives(self):
-        drives = []
-        for drive in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ':
-            drive_name = f'{drive}:'
-            drive_type = win32file.GetDriveType(drive_name)
-            if drive_type == win32file.DRIVE_REMOVABLE:
-                drives.append(drive_name)
-        return drives
-    
+        return self.drive_monitor.current()
+
+    def poll_drives(self):
+        # Picks up drives plugged in or removed while the window is open
+        if not self.master.winfo_exists():
+            return
+        if self.drive_monitor.changed():
+            self.update_drive_list()
+        self.master.after(DRIVE_POLL_MS, self.poll_drives)
+
     def browse_destination(self):
         folder_selected = filedialog.askdirectory()
         if folder_selected:
-            counter = 1
-            new_folder_name = f"Mission_{counter}"
-            new_folder_path = os.path.join(folder_selected, new_folder_name)
-            
-            while os.path.exists(new_folder_path):
-                counter += 1
-                new_folder_name = f"Mission_{counter}"
-                new_folder_path = os.path.join(folder_selected, new_folder_name)
-            
+            new_folder_path = next_mission_folder(folder_selected)
             os.makedirs(new_folder_path)
             self.dest_folder_var.set(new_folder_path)
             self.add_to_folder_history(folder_selected)
 
+    def browse_backup(self):
+        folder_selected = filedialog.askdirectory()
+        if folder_selected:
+            self.backup_folder_var.set(folder_selected)
+
     def add_to_folder_history(self, folder):
         folder_history = self.config.get('folder_history', [])
         if folder not in folder_history:
@@ -192,34 +224,132 @@ class MultiDriveCopyUtility:
             messagebox.showerror("Error", "Please select a destination folder.")
             return
 
+        # The backup gets a mission folder of the same name
+        destinations = [destination]
+        backup_folder = self.backup_folder_var.get().strip()
+        if backup_folder:
+            backup = os.path.join(backup_folder, os.path.basename(os.path.normpath(destination)))
+            if os.path.normpath(os.path.abspath(backup)) == os.path.normpath(os.path.abspath(destination)):
+                messagebox.showerror("Error", "The backup folder must be on another drive or folder.")
+                return
+            destinations.append(backup)
+
         unselected_drives = [name for name, path in source_drives.items() if not path]
         if unselected_drives:
             warning = f"The following drives are not selected: {', '.join(unselected_drives)}. Do you want to proceed?"
             if not messagebox.askyesno("Warning", warning):
                 return
 
+        try:
+            self.verification_policy = VerificationPolicy(self.verify_level_var.get(),
+                                                          self.hash_algorithm_var.get(),
+                                                          self.defer_verify_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        self.config['concurrent_copy'] = self.concurrent_var.get()
+        self.config['verify_level'] = self.verification_policy.level
+        self.config['hash_algorithm'] = self.verification_policy.hash_name
+        self.config['defer_verify'] = self.verification_policy.deferred
+        self.config['deduplicate'] = self.dedup_var.get()
+        self.config['backup_folder'] = backup_folder
+        self.save_config()
+
         # Disable UI elements
         self.disable_ui()
 
-        # Reset cancel flag
-        self.cancel_flag = False
+        options = IngestOptions(concurrent=self.concurrent_var.get(),
+                                max_concurrent_writes=self.config.get('max_concurrent_writes', MAX_CONCURRENT_WRITES),
+                                verification_policy=self.verification_policy,
+                                deduplicate=self.dedup_var.get(),
+                                split_bands=self.split_bands_var.get(),
+                                band_split_bands=self.config.get('band_split_bands', band_splitter.DEFAULT_BANDS),
+                                band_split_sizes=self.config.get('band_split_sizes', band_splitter.DEFAULT_SIZES),
+                                small_file_size=self.config.get('small_file_size', SMALL_FILE_SIZE),
+                                max_small_file_workers=self.config.get('max_small_file_workers', MAX_SMALL_FILE_WORKERS),
+                                copy_backend=self.config.get('copy_backend', DEFAULT_COPY_BACKEND))
+        # The engine only publishes; the window picks up the latest progress
+        # on its own tick
+        self.progress_bus = ProgressBus(coalesce=(EVENT_STATUS, EVENT_PROGRESS))
+        self.engine = IngestEngine(options, on_event=self.progress_bus.publish)
+        self.copy_destination = destination
 
         # Start copying process in a separate thread
-        self.copy_thread = threading.Thread(target=self.copy_files, args=(source_drives, destination), daemon=True)
+        self.copy_thread = threading.Thread(target=self.copy_files, args=(source_drives, destinations), daemon=True)
         self.copy_thread.start()
+        self.master.after(UI_TICK_MS, self.poll_progress_bus)
+
+    def copy_files(self, source_drives, destinations):
+        # Runs on the copy thread and must not touch Tk; poll_progress_bus
+        # reports the outcome
+        self.copy_error = None
+        try:
+            self.engine.run(source_drives, destinations)
+        except Exception as e:
+            logging.error(f"Copy process failed: {str(e)}")
+            self.copy_error = str(e)
+
+    def poll_progress_bus(self):
+        for event, data in self.progress_bus.drain():
+            self.apply_engine_event(event, data)
+        if self.copy_thread.is_alive():
+            self.master.after(UI_TICK_MS, self.poll_progress_bus)
+            return
+        # Events published just before the thread ended
+        for event, data in self.progress_bus.drain():
+            self.apply_engine_event(event, data)
+        if self.copy_error is not None:
+            self.copy_failed(self.copy_error)
+
+    def apply_engine_event(self, event, data):
+        if event == EVENT_STATUS:
+            self.update_status(data['message'])
+        elif event == EVENT_PROGRESS:
+            if 'files_total' in data:
+                self.update_progress(data['percent'], data['operation'],
+                                     f"Current file: {data['current_file']}",
+                                     f"Verified: {data['files_done']} / {data['files_total']}")
+            elif data.get('speed') is None:
+                self.update_progress(data['percent'], data['operation'], "",
+                                     f"Total copied: {format_size(data['copied_size'])}")
+            else:
+                self.update_progress(data['percent'], data['operation'],
+                                     f"Current file: {data['current_file']}",
+                                     f"Progress: {format_size(data['copied_size'])} / {format_size(data['total_size'])}",
+                                     f"Speed: {format_size(data['speed'])}/s",
+                                     f"ETA: {format_time(data['eta'])}")
+        elif event == EVENT_WARNING:
+            messagebox.showwarning(data['title'], data['message'])
+        elif event == EVENT_COMPLETE:
+            self.copy_complete(data)
+
+    def copy_complete(self, data):
+        self.enable_ui()
+        if data['cancelled']:
+            self.update_status("Copy process cancelled.")
+            return
+        self.add_to_folder_history(self.copy_destination)
+        source_drives = {name: manifest.root for name, manifest in self.engine.manifests.items()}
+        # Show statistics and ask about emptying drives
+        self.show_statistics_and_empty_drives(data['statistics'], source_drives, data.get('report'),
+                                              data.get('destinations'))
 
-        # Start a thread to check if copying is done
-        threading.Thread(target=self.check_copy_complete, daemon=True).start()
+    def copy_failed(self, message):
+        self.enable_ui()
+        self.update_status(f"Copy process failed: {message}")
 
     def disable_ui(self):
         for widget in [self.lidar_dropdown, self.altum_dropdown, self.sony_dropdown, 
-                    self.dest_folder_dropdown, self.master.nametowidget("!button")]:
+                    self.dest_folder_dropdown, self.master.nametowidget("!button"),
+                    self.backup_folder_entry, self.backup_browse_button]:
             self.set_widget_state(widget, 'disabled')
         self.cancel_button.configure(state='normal')
 
     def enable_ui(self):
         for widget in [self.lidar_dropdown, self.altum_dropdown, self.sony_dropdown, 
-                    self.dest_folder_dropdown, self.master.nametowidget("!button")]:
+                    self.dest_folder_dropdown, self.master.nametowidget("!button"),
+                    self.backup_folder_entry, self.backup_browse_button]:
             self.set_widget_state(widget, 'normal')
         self.cancel_button.configure(state='disabled')
 
@@ -242,151 +372,37 @@ class MultiDriveCopyUtility:
             pass
 
     def cancel_copy(self):
-        self.cancel_flag = True
+        if self.wiper is not None:
+            self.wiper.cancel()
+            self.update_status("Cancelling...")
+            return
+        if self.engine is not None:
+            self.engine.cancel()
         self.update_status("Cancelling copy process...")
 
-    def check_copy_complete(self):
-        self.copy_thread.join()
-        self.master.after(0, self.enable_ui)
-        if self.cancel_flag:
-            self.update_status("Copy process cancelled.")
-        else:
-            self.update_status("Copy process completed.")
-
-    def copy_files(self, source_drives, destination):
-        total_size = 0
-        for drive in source_drives.values():
-            if drive:
-                drive_size = sum(os.path.getsize(os.path.join(dirpath, filename))
-                                for dirpath, _, filenames in os.walk(drive)
-                                for filename in filenames)
-                total_size += drive_size
-                logging.info(f"Drive {drive} size: {self.format_size(drive_size)}")
-        
-        logging.info(f"Total size to copy: {self.format_size(total_size)}")
-        copied_size = 0
-        start_time = time.time()
-        statistics = {}
-
-        for drive_name, drive_path in source_drives.items():
-            if not drive_path or self.cancel_flag:
-                continue
-
-            dest_subfolder = os.path.join(destination, drive_name)
-            os.makedirs(dest_subfolder, exist_ok=True)
-            
-            try:
-                self.update_progress(0, f"Preparing to copy files from {drive_name}")
-                drive_stats = {'total_files': 0, 'copied_files': 0, 'total_size': 0, 'copied_size': 0}
-                
-                for root, _, files in os.walk(drive_path):
-                    for file in files:
-                        if self.cancel_flag:
-                            return
-
-                        src_file = os.path.join(root, file)
-                        rel_path = os.path.relpath(src_file, drive_path)
-                        dst_file = os.path.join(dest_subfolder, rel_path)
-                        os.makedirs(os.path.dirname(dst_file), exist_ok=True)
-                        
-                        file_size = os.path.getsize(src_file)
-                        drive_stats['total_files'] += 1
-                        drive_stats['total_size'] += file_size
-
-                        try:
-                            # Copy file and verify checksum
-                            if self.copy_and_verify(src_file, dst_file):
-                                drive_stats['copied_files'] += 1
-                                drive_stats['copied_size'] += file_size
-                                copied_size += file_size
-                            else:
-                                logging.error(f"Failed to copy or verify: {src_file}")
-                        except Exception as e:
-                            logging.error(f"Error copying file {src_file}: {str(e)}")
-
-                        progress = (copied_size / total_size) * 100 if total_size > 0 else 100
-                        elapsed_time = time.time() - start_time
-                        speed = copied_size / elapsed_time if elapsed_time > 0 else 0
-                        eta = (total_size - copied_size) / speed if speed > 0 else 0
-
-                        self.update_progress(progress, 
-                                            f"Copying {drive_name}",
-                                            f"Current file: {rel_path}",
-                                            f"Progress: {self.format_size(copied_size)} / {self.format_size(total_size)}",
-                                            f"Speed: {self.format_size(speed)}/s",
-                                            f"ETA: {self.format_time(eta)}")
-
-                statistics[drive_name] = drive_stats
-                logging.info(f"Completed copying {drive_name}. Stats: {drive_stats}")
-                self.update_status(f"Files from {drive_name} copied successfully.")
-            except Exception as e:
-                logging.error(f"Error copying files from {drive_name}: {str(e)}")
-                self.update_status(f"Error copying files from {drive_name}: {str(e)}")
-
-        if not self.cancel_flag:
-            self.add_to_folder_history(destination)
-            self.update_status("Copy process completed.")
-            self.update_progress(100, "Copy process completed", "", f"Total copied: {self.format_size(copied_size)}")
-            logging.info(f"Copy process completed. Total copied: {self.format_size(copied_size)}")
-            
-            # Run band_splitter if checkbox is checked and Altum drive was copied
-            if self.split_bands_var.get() and source_drives.get("Altum"):
-                altum_dest = os.path.join(destination, "Altum")
-                if os.path.exists(altum_dest):
-                    self.update_status("Running band splitter...")
-                    try:
-                        band_splitter.main(altum_dest)
-                        self.update_status("Band splitting completed.")
-                    except Exception as e:
-                        self.update_status(f"Error during band splitting: {str(e)}")
-                        logging.error(f"Error during band splitting: {str(e)}")
-            
-            # Show statistics and ask about emptying drives
-            self.master.after(0, lambda: self.show_statistics_and_empty_drives(statistics, source_drives))
-    def copy_and_verify(self, src, dst):
-        self.update_status(f"Copying: {os.path.basename(src)}")
-        shutil.copy2(src, dst)
-        self.update_status(f"Verifying: {os.path.basename(src)}")
-        if self.calculate_checksum(src) != self.calculate_checksum(dst):
-            messagebox.showwarning("Checksum Mismatch", f"Checksum mismatch for file: {src}")
-            return False
-        return True
-
-    def calculate_checksum(self, file_path):
-        hash_md5 = hashlib.md5()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-
     def update_progress(self, value, operation, current_file="", file_count="", speed="", eta=""):
+        # Only runs on the Tk thread (from poll_progress_bus), so the main
+        # loop redraws once per tick
         self.progress_var.set(value)
         self.current_operation_var.set(operation)
         self.current_file_var.set(current_file)
         self.file_count_var.set(file_count)
         self.speed_var.set(speed)
         self.eta_var.set(eta)
-        self.master.update_idletasks()
 
     def update_status(self, message):
         self.current_operation_var.set(message)
-        self.master.update_idletasks()
 
     def format_size(self, size):
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size < 1024.0:
-                return f"{size:.2f} {unit}"
-            size /= 1024.0
+        return format_size(size)
 
     def format_time(self, seconds):
-        minutes, seconds = divmod(int(seconds), 60)
-        hours, minutes = divmod(minutes, 60)
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        return format_time(seconds)
 
-    def show_statistics_and_empty_drives(self, statistics, source_drives):
+    def show_statistics_and_empty_drives(self, statistics, source_drives, report=None, destinations=None):
         stats_window = tk.Toplevel(self.master)
         stats_window.title("Copy Statistics")
-        stats_window.geometry("400x300")
+        stats_window.geometry("400x300" if not destinations or len(destinations) < 2 else "480x380")
 
         # Display statistics
         tk.Label(stats_window, text="Copy Statistics:", font=('Arial', 12, 'bold')).pack(pady=10)
@@ -394,6 +410,25 @@ class MultiDriveCopyUtility:
             tk.Label(stats_window, text=f"{drive}:").pack(anchor='w', padx=10)
             tk.Label(stats_window, text=f"  Files: {stats['copied_files']}/{stats['total_files']}").pack(anchor='w', padx=20)
             tk.Label(stats_window, text=f"  Size: {self.format_size(stats['copied_size'])}/{self.format_size(stats['total_size'])}").pack(anchor='w', padx=20)
+            if stats.get('skipped_files'):
+                tk.Label(stats_window, text=f"  Already copied earlier: {stats['skipped_files']}").pack(anchor='w', padx=20)
+        if report is not None and report['bottleneck']:
+            tk.Label(stats_window, text=f"Slowest stage: {STAGE_LABELS[report['bottleneck']]} "
+                                        f"({report['mb_per_s']:.1f} MB/s overall)").pack(anchor='w', padx=10)
+        if destinations and len(destinations) > 1:
+            for root, stats in destinations.items():
+                text = f"{root}: {stats['copied_files']} copied, {stats['skipped_files']} already there"
+                if stats['failed_files']:
+                    text += f", {stats['failed_files']} FAILED"
+                tk.Label(stats_window, text=text).pack(anchor='w', padx=10)
+
+        if not self.verification_policy.confirms_copies:
+            tk.Label(stats_window, text="The drives cannot be emptied from here: this copy was not read\n"
+                                        f"back (Verify: {self.verification_policy.level}). Copy again with "
+                                        "sampled or full\nverification first.",
+                     fg='red', justify='left').pack(pady=10, padx=10)
+            tk.Button(stats_window, text="Close", command=stats_window.destroy).pack(pady=20)
+            return
 
         # Ask about emptying drives
         tk.Label(stats_window, text="Select drives to empty:", font=('Arial', 12, 'bold')).pack(pady=10)
@@ -407,22 +442,67 @@ class MultiDriveCopyUtility:
         def empty_selected_drives():
             selected_drives = [drive for drive, var in drive_vars.items() if var.get()]
             if selected_drives:
-                if messagebox.askyesno("Confirm", f"Are you sure you want to empty the following drives: {', '.join(selected_drives)}?"):
-                    for drive in selected_drives:
-                        self.empty_drive(source_drives[drive])
-                    messagebox.showinfo("Complete", "Selected drives have been emptied.")
+                if messagebox.askyesno("Confirm", f"Are you sure you want to empty the following drives: {', '.join(selected_drives)}?\n\n"
+                                       "Only files verified by this copy are deleted; CONFIG files are kept."):
+                    stats_window.destroy()
+                    self.start_wipe(selected_drives)
+                    return
             stats_window.destroy()
 
         tk.Button(stats_window, text="Empty Selected Drives", command=empty_selected_drives).pack(pady=20)
 
-    
-    def empty_drive(self, drive_path):
-        for root, dirs, files in os.walk(drive_path, topdown=False):
-            for file in files:
-                if not file.startswith("CONFIG"):
-                    os.remove(os.path.join(root, file))
-            for dir in dirs:
-                os.rmdir(os.path.join(root, dir))
+    def start_wipe(self, drive_names):
+        # Deletes on a worker thread; progress comes through the same bus
+        # and tick as the copy
+        drives = [(name, self.engine.manifests[name], self.engine.verified_paths(name)) for name in drive_names]
+        self.disable_ui()
+        self.progress_bus = ProgressBus(coalesce=(EVENT_STATUS, EVENT_PROGRESS))
+        self.wiper = DriveWiper(on_event=self.progress_bus.publish)
+        self.wipe_error = None
+        self.wipe_thread = threading.Thread(target=self.wipe_drives, args=(drives,), daemon=True)
+        self.wipe_thread.start()
+        self.master.after(UI_TICK_MS, self.poll_wipe)
+
+    def wipe_drives(self, drives):
+        # Runs on the wipe thread and must not touch Tk
+        try:
+            self.wiper.run(drives)
+        except Exception as e:
+            logging.error(f"Emptying drives failed: {str(e)}")
+            self.wipe_error = str(e)
+
+    def poll_wipe(self):
+        for event, data in self.progress_bus.drain():
+            self.apply_wipe_event(event, data)
+        if self.wipe_thread.is_alive():
+            self.master.after(UI_TICK_MS, self.poll_wipe)
+            return
+        for event, data in self.progress_bus.drain():
+            self.apply_wipe_event(event, data)
+        if self.wipe_error is not None:
+            self.wiper = None
+            self.enable_ui()
+            self.update_status(f"Emptying drives failed: {self.wipe_error}")
+
+    def apply_wipe_event(self, event, data):
+        if event == EVENT_STATUS:
+            self.update_status(data['message'])
+        elif event == EVENT_PROGRESS:
+            self.update_progress(data['percent'], data['operation'], "",
+                                 f"Removed: {data['files_done']} / {data['files_total']}")
+        elif event == EVENT_COMPLETE:
+            self.enable_ui()
+            self.wiper = None
+            if data['cancelled']:
+                self.update_status("Emptying drives cancelled.")
+                return
+            self.update_status("Drives emptied.")
+            lines = [line for report in data['reports'] for line in format_wipe_report(report)]
+            left = any(len(report['left_behind']) > len(report['kept_config']) for report in data['reports'])
+            if left:
+                messagebox.showwarning("Drives Emptied", "\n".join(lines) + "\n\nSee copy_log.txt for the files left behind.")
+            else:
+                messagebox.showinfo("Complete", "\n".join(lines))
 
     def run(self):
         self.master.mainloop()
@@ -0,0 +1,180 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import os
+import json
+import threading
+import logging
+from utils.progress_bus import ProgressBus
+from utils.copy_backends import DEFAULT_COPY_BACKEND
+from utils.hashing import DEFAULT_HASH_ALGORITHM
+from utils.verification import VERIFY_LEVELS, DEFAULT_VERIFY_LEVEL, VerificationPolicy
+from utils.ingest_engine import EVENT_STATUS, EVENT_PROGRESS, EVENT_WARNING, EVENT_COMPLETE, format_size, format_time
+from utils.office_sync import OfficeSync, format_sync_report
+
+# How often the window applies the progress published by the sync threads
+UI_TICK_MS = 200
+
+
+class OfficeCopyUtility:
+    def __init__(self, master):
+        self.master = master
+        self.master.title("Office Copy Secondary Drive")
+        self.master.geometry("600x420")
+
+        self.config_file = "app_config.json"
+        self.config = self.load_config()
+
+        self.sync = None
+        self.progress_bus = None
+        self.sync_error = None
+        self.source_var = tk.StringVar(value=self.config.get('office_source', ''))
+        self.target_var = tk.StringVar(value=self.config.get('office_target', ''))
+        self.verify_level_var = tk.StringVar(value=self.config.get('verify_level', DEFAULT_VERIFY_LEVEL))
+        self.always_digest_var = tk.BooleanVar(value=False)
+
+        self.create_widgets()
+
+        logging.basicConfig(filename='copy_log.txt', level=logging.DEBUG,
+                            format='%(asctime)s - %(levelname)s - %(message)s')
+
+    def create_widgets(self):
+        tk.Label(self.master, text="Mission folder (field SSD):").grid(row=0, column=0, padx=10, pady=10, sticky="w")
+        tk.Entry(self.master, textvariable=self.source_var, width=40).grid(row=0, column=1, padx=10, pady=10)
+        tk.Button(self.master, text="Browse", command=lambda: self.browse(self.source_var)).grid(row=0, column=2, padx=10)
+
+        tk.Label(self.master, text="Copy into (secondary drive):").grid(row=1, column=0, padx=10, pady=10, sticky="w")
+        tk.Entry(self.master, textvariable=self.target_var, width=40).grid(row=1, column=1, padx=10, pady=10)
+        tk.Button(self.master, text="Browse", command=lambda: self.browse(self.target_var)).grid(row=1, column=2, padx=10)
+
+        self.options_frame = ttk.LabelFrame(self.master, text="Options")
+        self.options_frame.grid(row=2, column=0, columnspan=3, padx=10, pady=5, sticky="ew")
+        tk.Label(self.options_frame, text="Verify:").grid(row=0, column=0, padx=10, pady=2, sticky="w")
+        ttk.Combobox(self.options_frame, textvariable=self.verify_level_var, values=VERIFY_LEVELS,
+                     state="readonly", width=12).grid(row=0, column=1, padx=5, pady=2, sticky="w")
+        tk.Checkbutton(self.options_frame, text="Compare every file by checksum (slow)",
+                       variable=self.always_digest_var).grid(row=1, column=0, columnspan=2, padx=10, sticky="w")
+
+        self.sync_button = tk.Button(self.master, text="Sync", command=self.start_sync)
+        self.sync_button.grid(row=3, column=1, pady=15)
+
+        self.progress_frame = ttk.LabelFrame(self.master, text="Progress")
+        self.progress_frame.grid(row=4, column=0, columnspan=3, padx=10, pady=10, sticky="nsew")
+        self.progress_var = tk.DoubleVar()
+        ttk.Progressbar(self.progress_frame, variable=self.progress_var, maximum=100).grid(
+            row=0, column=0, padx=10, pady=5, sticky="ew")
+        self.current_operation_var = tk.StringVar()
+        tk.Label(self.progress_frame, textvariable=self.current_operation_var, anchor="w").grid(
+            row=1, column=0, padx=10, pady=2, sticky="w")
+        self.current_file_var = tk.StringVar()
+        tk.Label(self.progress_frame, textvariable=self.current_file_var, anchor="w").grid(
+            row=2, column=0, padx=10, pady=2, sticky="w")
+        self.speed_var = tk.StringVar()
+        tk.Label(self.progress_frame, textvariable=self.speed_var, anchor="w").grid(
+            row=3, column=0, padx=10, pady=2, sticky="w")
+        self.cancel_button = tk.Button(self.progress_frame, text="Cancel", command=self.cancel_sync, state=tk.DISABLED)
+        self.cancel_button.grid(row=4, column=0, pady=10)
+
+        self.progress_frame.grid_columnconfigure(0, weight=1)
+        self.master.grid_rowconfigure(4, weight=1)
+        self.master.grid_columnconfigure(1, weight=1)
+
+    def browse(self, var):
+        folder_selected = filedialog.askdirectory()
+        if folder_selected:
+            var.set(folder_selected)
+
+    def load_config(self):
+        if os.path.exists(self.config_file):
+            with open(self.config_file, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def save_config(self):
+        with open(self.config_file, 'w') as f:
+            json.dump(self.config, f)
+
+    def start_sync(self):
+        source = self.source_var.get()
+        target_parent = self.target_var.get()
+        if not source or not os.path.isdir(source):
+            messagebox.showerror("Error", "Please select the mission folder to copy.")
+            return
+        if not target_parent:
+            messagebox.showerror("Error", "Please select where to copy it to.")
+            return
+        # The mission folder is mirrored under the same name
+        target = os.path.join(target_parent, os.path.basename(os.path.normpath(source)))
+        if os.path.normpath(os.path.abspath(target)) == os.path.normpath(os.path.abspath(source)):
+            messagebox.showerror("Error", "The source and the target are the same folder.")
+            return
+
+        try:
+            policy = VerificationPolicy(self.verify_level_var.get(),
+                                        self.config.get('hash_algorithm', DEFAULT_HASH_ALGORITHM))
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        self.config['office_source'] = source
+        self.config['office_target'] = target_parent
+        self.save_config()
+
+        self.sync_button.configure(state='disabled')
+        self.cancel_button.configure(state='normal')
+        self.progress_bus = ProgressBus(coalesce=(EVENT_STATUS, EVENT_PROGRESS))
+        self.sync = OfficeSync(on_event=self.progress_bus.publish, verification_policy=policy,
+                               always_digest=self.always_digest_var.get(),
+                               copy_backend=self.config.get('copy_backend', DEFAULT_COPY_BACKEND))
+        self.sync_thread = threading.Thread(target=self.run_sync, args=(source, target), daemon=True)
+        self.sync_thread.start()
+        self.master.after(UI_TICK_MS, self.poll_progress_bus)
+
+    def run_sync(self, source, target):
+        # Runs on the sync thread and must not touch Tk
+        self.sync_error = None
+        try:
+            self.sync.run(source, target)
+        except Exception as e:
+            logging.error(f"Sync failed: {str(e)}")
+            self.sync_error = str(e)
+
+    def poll_progress_bus(self):
+        for event, data in self.progress_bus.drain():
+            self.apply_sync_event(event, data)
+        if self.sync_thread.is_alive():
+            self.master.after(UI_TICK_MS, self.poll_progress_bus)
+            return
+        for event, data in self.progress_bus.drain():
+            self.apply_sync_event(event, data)
+        if self.sync_error is not None:
+            self.sync_finished()
+            self.current_operation_var.set(f"Sync failed: {self.sync_error}")
+
+    def apply_sync_event(self, event, data):
+        if event == EVENT_STATUS:
+            self.current_operation_var.set(data['message'])
+        elif event == EVENT_PROGRESS:
+            self.progress_var.set(data['percent'])
+            self.current_file_var.set(f"Current file: {data['current_file']}")
+            self.speed_var.set(f"{format_size(data['copied_size'])} / {format_size(data['total_size'])}, "
+                               f"{format_size(data['speed'])}/s, ETA {format_time(data['eta'])}")
+        elif event == EVENT_WARNING:
+            messagebox.showwarning(data['title'], data['message'])
+        elif event == EVENT_COMPLETE:
+            self.sync_finished()
+            if data['cancelled']:
+                self.current_operation_var.set("Sync cancelled.")
+                return
+            self.progress_var.set(100)
+            report = data['report']
+            messagebox.showinfo("Sync Complete", "\n".join(format_sync_report(report))
+                                + f"\n\nReport saved to {report['report_path']}")
+
+    def sync_finished(self):
+        self.sync_button.configure(state='normal')
+        self.cancel_button.configure(state='disabled')
+
+    def cancel_sync(self):
+        if self.sync is not None:
+            self.sync.cancel()
+        self.current_operation_var.set("Cancelling sync...")
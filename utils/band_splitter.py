@@ -1,76 +1,357 @@
+import argparse
+import io
+import json
+import multiprocessing
 import os
-import tkinter as tk
-from tkinter import filedialog
-from PIL import Image
-import re
-import numpy as np
-from scipy.ndimage import zoom
 import shutil
+import sys
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Run as a script (python utils/band_splitter.py) the repository root is not
+# on the path yet
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.resampling import DEFAULT_KERNEL, KERNEL_CUBIC, resample, target_size
+
+# How many copied images may wait for a worker while holding their bytes in
+# memory; beyond that the worker re-reads the file from disk instead.
+MAX_PENDING_DATA = 64
+
+# Which bands to extract and at which preview sizes (longest side in px).
+# Every source image is decoded once and all of its sizes are written from
+# that single decode.
+DEFAULT_BANDS = (1,)
+DEFAULT_SIZES = (256,)
+DEFAULT_SIZE = 256
+
+# Index of already-processed sources, kept next to the output folders
+CACHE_FILENAME = ".band_splitter_cache.json"
 
 def select_folder():
+    # Tk is only needed for the interactive picker, not for headless use
+    import tkinter as tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()
     folder_path = filedialog.askdirectory(title="Select Parent Folder")
     return folder_path
 
-def process_images(parent_folder):
-    pattern = re.compile(r'.*_1\.tif$')
-    output_folder = os.path.join(parent_folder, "Band_1_folder")
-    os.makedirs(output_folder, exist_ok=True)
+def available_cores():
+    # Respect CPU affinity / container limits where the OS exposes them
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def parse_capture_name(file_name):
+    # IMG_0012_3.tif -> ('IMG_0012', 3); None for anything that is not a
+    # band capture. Plain string operations, no regex per file.
+    stem, ext = os.path.splitext(os.path.basename(file_name))
+    if ext.lower() not in ('.tif', '.tiff'):
+        return None
+    capture_id, sep, band = stem.rpartition('_')
+    if not sep or not band.isdigit():
+        return None
+    return capture_id, int(band)
+
+def output_folder_for(parent_folder, band, size):
+    # The default size keeps the original Band_N_folder name
+    if size == DEFAULT_SIZE:
+        return os.path.join(parent_folder, f"Band_{band}_folder")
+    return os.path.join(parent_folder, f"Band_{band}_{size}px_folder")
+
+def is_output_folder_name(name):
+    return name.startswith("Band_") and name.endswith("_folder")
+
+def output_folders(parent_folder, bands, sizes):
+    return [output_folder_for(parent_folder, band, size) for band in bands for size in sizes]
+
+def is_band_image(file_name, bands=DEFAULT_BANDS):
+    parsed = parse_capture_name(file_name)
+    return parsed is not None and parsed[1] in bands
+
+def find_captures(parent_folder, bands=DEFAULT_BANDS):
+    # Returns {(folder, capture_id): [(band, path), ...]} so all bands of a
+    # capture are handled by the same worker.
+    captures = {}
+    for root, dirs, files in os.walk(parent_folder):
+        # Skip the output folders (of any band/size, not just this run's)
+        if root == parent_folder:
+            dirs[:] = [d for d in dirs if not is_output_folder_name(d)]
 
-    for root, _, files in os.walk(parent_folder):
-        # Skip the output folder
-        if root == output_folder:
-            continue
-        
         for file in files:
-            if pattern.match(file):
-                input_path = os.path.join(root, file)
-                output_path = os.path.join(output_folder, file)
-                
-                try:
-                    with Image.open(input_path) as img:
-                        if img.mode != 'I;16':
-                            print(f"Skipping {input_path}: Not in I;16 mode")
-                            continue
-
-                        # Calculate the new size while maintaining aspect ratio
-                        width, height = img.size
-                        if width > height:
-                            new_width = 256
-                            new_height = int(height * (256 / width))
-                        else:
-                            new_height = 256
-                            new_width = int(width * (256 / height))
-
-                        # Convert to numpy array
-                        img_array = np.array(img)
-
-                        # Resize using numpy
-                        zoom_factors = (new_height / height, new_width / width)
-                        resized_array = zoom(img_array, zoom_factors, order=3)
-
-                        # Convert back to Image
-                        resized_img = Image.fromarray(resized_array.astype(np.uint16), mode='I;16')
-
-                        # Save as TIFF
-                        resized_img.save(output_path, format='TIFF')
-                        
-                        # Copy original file's modification time to the new file
-                        shutil.copystat(input_path, output_path)
-                        
-                    print(f"Processed and saved: {output_path}")
-                except Exception as e:
-                    print(f"Error processing {input_path}: {str(e)}")
-
-def main():
-    parent_folder = select_folder()
+            parsed = parse_capture_name(file)
+            if parsed is None or parsed[1] not in bands:
+                continue
+            captures.setdefault((root, parsed[0]), []).append((parsed[1], os.path.join(root, file)))
+    return captures
+
+def catalog_captures(parent_folder, bands=DEFAULT_BANDS):
+    # Same result as find_captures, from the catalog of the mission that
+    # parent_folder (<mission>/Altum) belongs to; None when there is no
+    # catalog or it has no band images for this folder. The catalog only
+    # knows what the ingest copied: images added to the folder afterwards are
+    # not listed, and files deleted by hand still are (and show up as errors).
+    from utils.mission_catalog import open_catalog
+    parent_folder = os.path.normpath(parent_folder)
+    catalog = open_catalog(os.path.dirname(parent_folder))
+    if catalog is None:
+        return None
+    try:
+        rows = catalog.band_files(bands, sensor=os.path.basename(parent_folder))
+    finally:
+        catalog.close()
+    if not rows:
+        return None
+    captures = {}
+    for folder, capture_id, band, path in rows:
+        root = os.path.join(parent_folder, *folder.split('/')) if folder else parent_folder
+        captures.setdefault((root, capture_id), []).append((band, path))
+    return captures
+
+def process_band_file(input_path, band, parent_folder, sizes=DEFAULT_SIZES, kernel=DEFAULT_KERNEL, data=None):
+    # Runs in a worker process; returns (status, path, message) so the
+    # parent can report every file the same way as the serial path.
+    # data, when given, is the already-read content of input_path.
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data) if data is not None else input_path) as img:
+            if img.mode != 'I;16':
+                return 'skipped', input_path, f"Skipping {input_path}: Not in I;16 mode"
+
+            img.load()
+            width, height = img.size
+            file_name = os.path.basename(input_path)
+            saved = []
+            # Largest size first; each smaller level is made from the previous
+            # one (a small pyramid), except with the cubic kernel which always
+            # resamples the full image for fidelity.
+            level = img
+            for size in sorted(set(sizes), reverse=True):
+                # Calculate the new size while maintaining aspect ratio
+                new_size = target_size(width, height, size)
+                level = resample(img if kernel == KERNEL_CUBIC else level, new_size, kernel)
+
+                # Save as TIFF
+                output_path = os.path.join(output_folder_for(parent_folder, band, size), file_name)
+                level.save(output_path, format='TIFF')
+
+                # Copy original file's modification time to the new file
+                shutil.copystat(input_path, output_path)
+                saved.append(output_path)
+
+        return 'processed', input_path, "\n".join(f"Processed and saved: {path}" for path in saved)
+    except Exception as e:
+        return 'error', input_path, f"Error processing {input_path}: {str(e)}"
+
+class ThumbnailCache:
+    # Remembers which sources were processed with which parameters, keyed by
+    # the source path relative to parent_folder, so reruns only process new
+    # or changed captures.
+    def __init__(self, parent_folder):
+        self.parent_folder = parent_folder
+        self.path = os.path.join(parent_folder, CACHE_FILENAME)
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                print(f"Ignoring damaged cache index {self.path}")
+
+    def params_key(self, kernel, sizes):
+        return f"{kernel}|{','.join(str(size) for size in sorted(set(sizes)))}"
+
+    def key_for(self, input_path):
+        return os.path.relpath(input_path, self.parent_folder).replace(os.sep, '/')
+
+    def is_fresh(self, input_path, band, kernel, sizes):
+        entry = self.entries.get(self.key_for(input_path))
+        if entry is None or entry['params'] != self.params_key(kernel, sizes):
+            return False
+        try:
+            st = os.stat(input_path)
+        except OSError:
+            return False
+        if entry['size'] != st.st_size or entry['mtime'] != st.st_mtime:
+            return False
+        file_name = os.path.basename(input_path)
+        return all(os.path.exists(os.path.join(output_folder_for(self.parent_folder, band, size), file_name))
+                   for size in sizes)
+
+    def update(self, input_path, kernel, sizes):
+        st = os.stat(input_path)
+        with self.lock:
+            self.entries[self.key_for(input_path)] = {'size': st.st_size, 'mtime': st.st_mtime,
+                                                      'params': self.params_key(kernel, sizes)}
+
+    def evict_missing(self):
+        # Drop entries whose source is gone
+        with self.lock:
+            missing = [key for key in self.entries
+                       if not os.path.exists(os.path.join(self.parent_folder, key))]
+            for key in missing:
+                del self.entries[key]
+        return len(missing)
+
+    def save(self):
+        with self.lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+
+def process_capture(files, parent_folder, sizes=DEFAULT_SIZES, kernel=DEFAULT_KERNEL):
+    return [process_band_file(path, band, parent_folder, sizes, kernel) for band, path in files]
+
+def process_capture_task(task):
+    return process_capture(*task)
+
+def new_stats(total, workers):
+    return {'total': total, 'processed': 0, 'cached': 0, 'skipped': 0, 'errors': 0,
+            'failed_files': [], 'workers': workers, 'elapsed': 0.0}
+
+def record_result(stats, result, cache=None, kernel=None, sizes=None):
+    status, path, message = result
+    print(message)
+    if status == 'processed':
+        stats['processed'] += 1
+        if cache is not None:
+            cache.update(path, kernel, sizes)
+    elif status == 'skipped':
+        stats['skipped'] += 1
+    else:
+        stats['errors'] += 1
+        stats['failed_files'].append(path)
+
+def process_images(parent_folder, workers=None, kernel=DEFAULT_KERNEL, bands=DEFAULT_BANDS, sizes=DEFAULT_SIZES,
+                   use_cache=True, use_catalog=False):
+    for folder in output_folders(parent_folder, bands, sizes):
+        os.makedirs(folder, exist_ok=True)
+
+    start_time = time.time()
+    # use_catalog skips the walk for a mission nothing was added to since
+    # its ingest
+    captures = catalog_captures(parent_folder, bands) if use_catalog else None
+    if captures is None:
+        captures = find_captures(parent_folder, bands)
+    total = sum(len(files) for files in captures.values())
+    cache = ThumbnailCache(parent_folder) if use_cache else None
+    if cache is not None:
+        evicted = cache.evict_missing()
+        if evicted:
+            print(f"Removed {evicted} cache entries for sources that no longer exist")
+        # Only new or changed sources (or changed parameters) are processed
+        captures = {capture: [(band, path) for band, path in files
+                              if not cache.is_fresh(path, band, kernel, sizes)]
+                    for capture, files in captures.items()}
+        captures = {capture: files for capture, files in captures.items() if files}
+    tasks = [(files, parent_folder, sizes, kernel) for files in captures.values()]
+    workers = min(workers or available_cores(), max(len(tasks), 1))
+    stats = new_stats(total, workers)
+    stats['cached'] = total - sum(len(files) for files in captures.values())
+
+    def record(result):
+        record_result(stats, result, cache, kernel, sizes)
+
+    if workers <= 1:
+        for task in tasks:
+            for result in process_capture(*task):
+                record(result)
+    else:
+        # Decode/resample is CPU bound, so spread the captures over processes.
+        # Small chunks keep all workers busy without a long tail.
+        chunksize = max(1, len(tasks) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            for results in executor.map(process_capture_task, tasks, chunksize=chunksize):
+                for result in results:
+                    record(result)
+
+    if cache is not None:
+        cache.save()
+    stats['elapsed'] = time.time() - start_time
+    return stats
+
+class StreamingBandSplitter:
+    # Band splitting that runs alongside the copy: each band image is queued
+    # as soon as it has been copied (and verified), preferably with the bytes
+    # the copy already read, so no second pass over the destination is needed.
+    def __init__(self, parent_folder, workers=None, kernel=DEFAULT_KERNEL, bands=DEFAULT_BANDS, sizes=DEFAULT_SIZES,
+                 use_cache=True):
+        self.parent_folder = parent_folder
+        self.cache = ThumbnailCache(parent_folder) if use_cache else None
+        self.cached = 0
+        self.kernel = kernel
+        self.bands = tuple(bands)
+        self.sizes = tuple(sizes)
+        for folder in output_folders(parent_folder, self.bands, self.sizes):
+            os.makedirs(folder, exist_ok=True)
+        # Leave a core for the copy threads
+        self.workers = workers or max(1, available_cores() - 1)
+        # Spawned, not forked: the ingest's copy threads (and the locks they
+        # hold) would be copied into a forked child
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        self.futures = []
+        self.pending_data = threading.BoundedSemaphore(MAX_PENDING_DATA)
+        self.start_time = time.time()
+
+    def wants(self, file_name):
+        return is_band_image(file_name, self.bands)
+
+    def submit(self, input_path, data=None):
+        band = parse_capture_name(input_path)[1]
+        if self.cache is not None and self.cache.is_fresh(input_path, band, self.kernel, self.sizes):
+            self.cached += 1
+            return
+        if data is not None and not self.pending_data.acquire(blocking=False):
+            data = None
+        future = self.executor.submit(process_band_file, input_path, band, self.parent_folder,
+                                      self.sizes, self.kernel, data)
+        if data is not None:
+            future.add_done_callback(lambda _: self.pending_data.release())
+        self.futures.append(future)
+
+    def close(self, cancel=False):
+        if cancel:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        stats = new_stats(len(self.futures) + self.cached, self.workers)
+        stats['cached'] = self.cached
+        for future in self.futures:
+            if future.cancelled():
+                continue
+            try:
+                record_result(stats, future.result(), self.cache, self.kernel, self.sizes)
+            except Exception as e:
+                record_result(stats, ('error', '', f"Error processing band image: {str(e)}"))
+        self.executor.shutdown(wait=True)
+        if self.cache is not None:
+            self.cache.save()
+        stats['elapsed'] = time.time() - self.start_time
+        return stats
+
+def main(argv=None):
+    # python -m utils.band_splitter [folder] [--catalog]; without a folder
+    # one is picked in a dialog
+    parser = argparse.ArgumentParser(description="Split the Altum band images of a folder into previews.")
+    parser.add_argument('folder', nargs='?', help="Altum folder of a mission")
+    parser.add_argument('--catalog', action='store_true',
+                        help="Take the captures from the mission catalog instead of walking the folder "
+                             "(only for missions nothing was added to since the ingest)")
+    args = parser.parse_args(argv)
+    parent_folder = args.folder or select_folder()
     if parent_folder:
         print(f"Selected folder: {parent_folder}")
-        process_images(parent_folder)
-        print("Processing complete!")
+        stats = process_images(parent_folder, use_catalog=args.catalog)
+        print(f"Processing complete! {stats['processed']} processed, {stats['cached']} unchanged, "
+              f"{stats['skipped']} skipped, {stats['errors']} errors in {stats['elapsed']:.1f}s using {stats['workers']} worker(s)")
     else:
         print("No folder selected. Exiting.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
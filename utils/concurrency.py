@@ -0,0 +1,40 @@
+import logging
+
+
+class ConcurrencyTuner:
+    # Picks how many small files to copy at once from the measured
+    # throughput of the previous batch: keep stepping in the same direction
+    # while throughput improves, step back when it drops, hold on a plateau.
+    # Whether more parallel streams help depends on the source reader and
+    # the destination (SSD vs HDD), so it is measured rather than fixed.
+    def __init__(self, max_workers, min_workers=1, start=2, tolerance=0.05):
+        self.min_workers = min_workers
+        self.max_workers = max(min_workers, max_workers)
+        self.concurrency = max(self.min_workers, min(start, self.max_workers))
+        self.tolerance = tolerance
+        self.direction = 1
+        self.last_throughput = None
+
+    def record(self, size, elapsed):
+        # Returns the concurrency to use for the next batch
+        if size <= 0 or elapsed <= 0:
+            return self.concurrency
+        throughput = size / elapsed
+        if self.last_throughput is not None:
+            if throughput < self.last_throughput * (1 - self.tolerance):
+                # The last step made things worse; go back
+                self.direction = -self.direction
+            elif throughput <= self.last_throughput * (1 + self.tolerance):
+                self.last_throughput = throughput
+                return self.concurrency
+        self.last_throughput = throughput
+
+        concurrency = self.concurrency + self.direction
+        if concurrency < self.min_workers or concurrency > self.max_workers:
+            self.direction = -self.direction
+            concurrency = max(self.min_workers, min(concurrency, self.max_workers))
+        if concurrency != self.concurrency:
+            logging.debug(f"Small-file concurrency {self.concurrency} -> {concurrency} "
+                          f"({throughput / (1024 * 1024):.1f} MB/s)")
+        self.concurrency = concurrency
+        return concurrency
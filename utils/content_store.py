@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import shutil
+import threading
+
+from utils.copy_engine import pipelined_copy, reflink
+from utils.hashing import file_digest
+
+STORE_DIRNAME = '.content_store'
+INDEX_FILENAME = 'index.json'
+
+
+def store_root_for(destination):
+    # One store per destination parent, shared by all its Mission_N folders
+    return os.path.join(os.path.dirname(os.path.normpath(destination)), STORE_DIRNAME)
+
+
+class ContentStore:
+    # Content-addressed copies of everything ingested under a destination
+    # parent, stored as objects/<hash>/<xx>/<digest>. The index maps a cheap
+    # source fingerprint (file name, size, mtime) to the digest, so a file
+    # that was already ingested for an earlier mission can be recognised
+    # without copying it again and linked into the new mission instead.
+    # Objects are files of their own, cloned or copied from the first mission
+    # that had them, so rewriting that mission's file leaves them alone.
+    def __init__(self, root, hash_name):
+        self.root = root
+        self.hash_name = hash_name
+        self.index_path = os.path.join(root, INDEX_FILENAME)
+        self.lock = threading.Lock()
+        self.linked_files = 0
+        self.linked_size = 0
+        os.makedirs(root, exist_ok=True)
+        self.index = self.load_index()
+
+    def load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except ValueError:
+                logging.warning(f"Content store index {self.index_path} is damaged, starting a new one")
+        return {}
+
+    def save_index(self):
+        with self.lock:
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f)
+            os.replace(tmp_path, self.index_path)
+
+    def fingerprint(self, entry):
+        return f"{self.hash_name}|{os.path.basename(entry.rel_path)}|{entry.size}|{entry.mtime}"
+
+    def object_path(self, digest):
+        return os.path.join(self.root, 'objects', self.hash_name, digest[:2], digest)
+
+    def lookup(self, entry):
+        with self.lock:
+            digest = self.index.get(self.fingerprint(entry))
+        if digest is None:
+            return None
+        obj = self.object_path(digest)
+        try:
+            if os.path.getsize(obj) != entry.size:
+                return None
+        except OSError:
+            return None
+        return digest
+
+    def link(self, obj, dst):
+        # Prefer a copy-on-write clone (independent file, shared blocks),
+        # then a hardlink; either way no data is copied.
+        tmp_dst = dst + '.linking'
+        if os.path.exists(tmp_dst):
+            os.remove(tmp_dst)
+        if reflink(obj, tmp_dst):
+            shutil.copystat(obj, tmp_dst)
+        else:
+            try:
+                os.link(obj, tmp_dst)
+            except OSError:
+                return False
+        os.replace(tmp_dst, dst)
+        return True
+
+    def link_known(self, entry, src, dst, verify_source=False):
+        digest = self.lookup(entry)
+        if digest is None:
+            return None
+        # With full verification the fingerprint alone is not trusted: the
+        # source is hashed (one read, nothing written) and must match.
+        if verify_source and file_digest(src, self.hash_name) != digest:
+            return None
+        if not self.link(self.object_path(digest), dst):
+            return None
+        with self.lock:
+            self.linked_files += 1
+            self.linked_size += entry.size
+        return digest
+
+    def add(self, entry, dst, digest):
+        obj = self.object_path(digest)
+        if not os.path.exists(obj):
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            tmp_obj = f"{obj}.{threading.get_ident()}.tmp"
+            try:
+                # A clone costs no space; the copy is checked against the
+                # digest, as it is the data later missions will get
+                if reflink(dst, tmp_obj):
+                    shutil.copystat(dst, tmp_obj)
+                elif pipelined_copy(dst, tmp_obj, hash_name=self.hash_name).digest != digest:
+                    raise IOError(f"{dst} does not match its digest any more")
+                os.replace(tmp_obj, obj)
+            except OSError as e:
+                logging.debug(f"Cannot add {dst} to the content store: {str(e)}")
+                if os.path.exists(tmp_obj):
+                    os.remove(tmp_obj)
+                return
+        with self.lock:
+            self.index[self.fingerprint(entry)] = digest
@@ -0,0 +1,226 @@
+import errno
+import logging
+import os
+import platform
+import shutil
+import threading
+import time
+
+from utils.copy_engine import (CHECKPOINT_INTERVAL, BUFFER_SIZE, CopyCancelled, CopyResult, pipelined_copy, reflink,
+                               unlink_existing)
+from utils.hashing import file_digest
+
+# Ways of copying a single file:
+#   pipelined  the user-space ring buffer copy, hashing the source in flight
+#   kernel     os.copy_file_range (sendfile as fallback); the data never
+#              passes through Python and NFS/SMB/Btrfs/XFS can copy
+#              server-side or share extents
+#   reflink    copy-on-write clone, where source and destination share a
+#              file system that supports it
+#   copy2      shutil.copy2, the original method
+# All but pipelined hash the source after copying, which re-reads it from
+# the page cache; files larger than POST_HASH_MAX_SIZE that need a digest
+# always go through pipelined so the source is read only once and large
+# copies keep their resume checkpoints.
+BACKEND_AUTO = 'auto'
+BACKEND_PIPELINED = 'pipelined'
+BACKEND_KERNEL = 'kernel'
+BACKEND_REFLINK = 'reflink'
+BACKEND_COPY2 = 'copy2'
+COPY_BACKENDS = (BACKEND_PIPELINED, BACKEND_KERNEL, BACKEND_REFLINK, BACKEND_COPY2)
+DEFAULT_COPY_BACKEND = BACKEND_AUTO
+
+# Bytes per copy_file_range/sendfile call; cancelling is checked in between
+KERNEL_CHUNK = 64 * 1024 * 1024
+POST_HASH_MAX_SIZE = CHECKPOINT_INTERVAL
+# Files of this size range are used to probe a source/destination pair
+PROBE_MIN_SIZE = 8 * 1024 * 1024
+PROBE_MAX_SIZE = 256 * 1024 * 1024
+PROBE_SUFFIX = '.copyprobe'
+
+
+class BackendUnavailable(Exception):
+    pass
+
+
+def kernel_copy(src, dst, cancel_check=None):
+    if platform.system() != 'Linux':
+        raise BackendUnavailable("kernel copy is only available on Linux")
+    with open(src, 'rb') as fs, open(dst, 'wb') as fd:
+        size = os.fstat(fs.fileno()).st_size
+        use_range = hasattr(os, 'copy_file_range')
+        offset = 0
+        while offset < size:
+            if cancel_check is not None and cancel_check():
+                raise CopyCancelled(src)
+            count = min(KERNEL_CHUNK, size - offset)
+            try:
+                if use_range:
+                    n = os.copy_file_range(fs.fileno(), fd.fileno(), count)
+                else:
+                    n = os.sendfile(fd.fileno(), fs.fileno(), offset, count)
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+                # copy_file_range refuses some file system pairs; sendfile
+                # carries on from the same offset
+                if use_range:
+                    use_range = False
+                    continue
+                raise BackendUnavailable(f"kernel copy not supported for {dst}: {e}")
+            if not n:
+                break
+            offset += n
+        if offset < size:
+            # The source ended early (or the kernel stopped); the pipelined
+            # copy reads it to its real end
+            raise BackendUnavailable(f"kernel copy of {src} stopped at {offset} of {size} bytes")
+
+
+def copy_with(backend, src, dst, hash_name=None, cancel_check=None, sampler=None):
+    # Copies src to dst (with its timestamps) and returns a CopyResult. The
+    # non-pipelined backends report their whole copy as write time; only
+    # pipelined feeds the sampler.
+    if backend == BACKEND_PIPELINED:
+        return pipelined_copy(src, dst, hash_name=hash_name, cancel_check=cancel_check, sampler=sampler)
+    if cancel_check is not None and cancel_check():
+        raise CopyCancelled(src)
+    # Never written in place (see unlink_existing); clonefile on macOS would
+    # not replace an existing file anyway
+    unlink_existing(dst)
+    start_time = time.perf_counter()
+    if backend == BACKEND_KERNEL:
+        kernel_copy(src, dst, cancel_check)
+        shutil.copystat(src, dst)
+    elif backend == BACKEND_REFLINK:
+        if not reflink(src, dst):
+            raise BackendUnavailable(f"reflink not supported for {dst}")
+        shutil.copystat(src, dst)
+    elif backend == BACKEND_COPY2:
+        shutil.copy2(src, dst)
+    else:
+        raise ValueError(f"Unknown copy backend: {backend}")
+    write_time = time.perf_counter() - start_time
+
+    digest = None
+    hash_time = 0.0
+    if hash_name is not None:
+        start_time = time.perf_counter()
+        digest = file_digest(src, hash_name)
+        hash_time = time.perf_counter() - start_time
+    return CopyResult(digest, os.path.getsize(dst), 0.0, write_time, hash_time)
+
+
+def warm_cache(path, buffer_size=BUFFER_SIZE):
+    buf = bytearray(buffer_size)
+    with open(path, 'rb', buffering=0) as f:
+        while f.readinto(buf):
+            pass
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class CopyBackendSelector:
+    # Chooses the backend per (source device, destination device) pair.
+    # With 'auto', the first file of PROBE_MIN_SIZE..PROBE_MAX_SIZE copied
+    # between a pair is copied once with every backend into a temporary file
+    # next to its destination. The source is read once beforehand, so every
+    # backend sees the same cached source and the comparison is of what the
+    # backends themselves cost, hashing included. The fastest copy is kept as
+    # the real one. Until a pair has been probed its files use pipelined.
+    # A fixed backend that turns out to be unavailable for a pair falls back
+    # to pipelined for that pair.
+    def __init__(self, backend=DEFAULT_COPY_BACKEND):
+        if backend != BACKEND_AUTO and backend not in COPY_BACKENDS:
+            raise ValueError(f"Unknown copy backend: {backend}")
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.chosen = {}
+        # Pairs being probed; their other files use pipelined meanwhile
+        self.probing = set()
+        # "src_dev->dst_dev": {backend: seconds, or None when unavailable}
+        self.probes = {}
+
+    def pair(self, src, dst):
+        return os.stat(src).st_dev, os.stat(os.path.dirname(dst) or '.').st_dev
+
+    def copy(self, src, dst, size, hash_name=None, cancel_check=None, sampler=None):
+        # Returns (backend name, CopyResult)
+        pair = self.pair(src, dst)
+        probe = False
+        with self.lock:
+            backend = self.chosen.get(pair)
+            if (backend is None and self.backend == BACKEND_AUTO and pair not in self.probing
+                    and PROBE_MIN_SIZE <= size <= PROBE_MAX_SIZE):
+                self.probing.add(pair)
+                probe = True
+        # The probe copies a large file several times; other threads (and
+        # other device pairs) must not wait for it
+        if probe:
+            try:
+                return self.probe(pair, src, dst, hash_name, cancel_check)
+            finally:
+                with self.lock:
+                    self.probing.discard(pair)
+        if backend is None:
+            backend = BACKEND_PIPELINED if self.backend == BACKEND_AUTO else self.backend
+        if backend != BACKEND_PIPELINED and hash_name is not None and size > POST_HASH_MAX_SIZE:
+            backend = BACKEND_PIPELINED
+        try:
+            return backend, copy_with(backend, src, dst, hash_name, cancel_check, sampler)
+        except BackendUnavailable as e:
+            logging.warning(f"{str(e)}; using {BACKEND_PIPELINED} for this drive")
+            with self.lock:
+                self.chosen[pair] = BACKEND_PIPELINED
+            return BACKEND_PIPELINED, copy_with(BACKEND_PIPELINED, src, dst, hash_name, cancel_check, sampler)
+
+    def probe(self, pair, src, dst, hash_name, cancel_check):
+        warm_cache(src)
+        times = {}
+        best = None
+        error = None
+        tmp_dsts = []
+        try:
+            for backend in COPY_BACKENDS:
+                tmp_dst = f"{dst}.{backend}{PROBE_SUFFIX}"
+                tmp_dsts.append(tmp_dst)
+                start_time = time.perf_counter()
+                try:
+                    result = copy_with(backend, src, tmp_dst, hash_name, cancel_check)
+                except (BackendUnavailable, OSError) as e:
+                    remove_quietly(tmp_dst)
+                    times[backend] = None
+                    if backend == BACKEND_PIPELINED:
+                        error = e
+                    continue
+                elapsed = time.perf_counter() - start_time
+                times[backend] = elapsed
+                # Only the fastest copy so far is kept on disk
+                if best is None or elapsed < best[1]:
+                    if best is not None:
+                        remove_quietly(best[2])
+                    best = (backend, elapsed, tmp_dst, result)
+                else:
+                    remove_quietly(tmp_dst)
+            if best is None:
+                raise error or IOError(f"No copy backend could copy {src}")
+            os.replace(best[2], dst)
+        finally:
+            # Whatever happened (cancelled included), no probe copy stays
+            # behind in the mission folder; the kept one has been moved
+            for tmp_dst in tmp_dsts:
+                remove_quietly(tmp_dst)
+
+        label = f"{pair[0]:#x}->{pair[1]:#x}"
+        with self.lock:
+            self.chosen[pair] = best[0]
+            self.probes[label] = times
+        logging.info(f"Copy backend for {label}: {best[0]} (probe on {os.path.basename(src)}: "
+                     + ", ".join(f"{name} {'n/a' if seconds is None else f'{seconds:.3f}s'}"
+                                 for name, seconds in times.items()) + ")")
+        return best[0], best[3]
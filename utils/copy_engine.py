@@ -0,0 +1,363 @@
+import os
+import platform
+import queue
+import shutil
+import threading
+import time
+
+from utils.hashing import DEFAULT_HASH_ALGORITHM, new_hasher
+
+# Size of each buffer in the ring and the number of buffers the reader may
+# fill ahead of the writer. 8 x 4 MB keeps a USB reader busy without holding
+# much memory per file.
+BUFFER_SIZE = 4 * 1024 * 1024
+RING_SIZE = 8
+# Copying to several destinations gets a deeper ring, so a destination can
+# fall further behind before it slows down the others
+FANOUT_RING_SIZE = 16
+
+# How often (in bytes) a checkpoint callback gets the verified prefix digest,
+# so an interrupted copy of a large file can be resumed from there.
+CHECKPOINT_INTERVAL = 256 * 1024 * 1024
+
+# Smallest buffer handed out for a file; a file that grows while it is
+# copied is still read to the end, in buffers of at least this size
+MIN_BUFFER_SIZE = 64 * 1024
+
+# ioctl number for a copy-on-write clone on Linux
+FICLONE = 0x40049409
+
+
+def ring_for(size, buffer_size, ring_size):
+    # Buffer size and count for a file of `size` bytes: no more memory than
+    # the file needs (plus one buffer for the final, empty read), so small
+    # files do not pay for zero-filling a full ring
+    buffer_size = max(MIN_BUFFER_SIZE, min(buffer_size, size))
+    chunks = -(-size // buffer_size)
+    return buffer_size, max(1, min(ring_size, chunks + 1))
+
+
+def unlink_existing(path):
+    # A destination may be a hardlink to a content store object, shared with
+    # other missions; opening it with 'wb' would truncate all of them. Every
+    # copy removes it first and writes a file of its own.
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return BUFFER_SIZE
+
+
+class CopyCancelled(Exception):
+    pass
+
+
+class CopyResult:
+    __slots__ = ('digest', 'size', 'read_time', 'write_time', 'hash_time', 'resumed_from', 'data')
+
+    def __init__(self, digest, size, read_time, write_time, hash_time, resumed_from=0, data=None):
+        self.digest = digest
+        self.size = size
+        self.read_time = read_time
+        self.write_time = write_time
+        self.hash_time = hash_time
+        self.resumed_from = resumed_from
+        self.data = data
+
+    def __repr__(self):
+        return (f"CopyResult(digest={self.digest!r}, size={self.size}, read_time={self.read_time:.3f}, "
+                f"write_time={self.write_time:.3f}, hash_time={self.hash_time:.3f}, "
+                f"resumed_from={self.resumed_from})")
+
+
+def pipelined_copy(src, dst, hash_name=DEFAULT_HASH_ALGORITHM, buffer_size=BUFFER_SIZE, ring_size=RING_SIZE,
+                   cancel_check=None, resume_offset=0, resume_hasher=None, checkpoint=None,
+                   checkpoint_interval=CHECKPOINT_INTERVAL, keep_data=False, sampler=None):
+    # The reader stage fills buffers from the source and hashes them in
+    # flight; the writer stage drains them into the destination. Buffers go
+    # back to the free ring once written, so memory use is bounded by
+    # ring_size * buffer_size and the source is read exactly once.
+    #
+    # To resume, pass the offset up to which dst is known to match src and a
+    # hasher that has already consumed those bytes (see resume_hasher_for).
+    # checkpoint(offset, prefix_digest) is called from the writer once the
+    # data up to offset is on disk.
+    #
+    # keep_data=True also returns the file contents in result.data, for
+    # small files that are processed straight after copying. sampler, when
+    # given, gets update(offset, data) for every block read.
+    free_buffers = queue.Queue()
+    filled_buffers = queue.Queue()
+    buffer_size, ring_size = ring_for(max(0, file_size(src) - resume_offset), buffer_size, ring_size)
+    for _ in range(ring_size):
+        free_buffers.put(bytearray(buffer_size))
+
+    if resume_offset:
+        hasher = resume_hasher
+    else:
+        hasher = new_hasher(hash_name) if hash_name else None
+    stop = threading.Event()
+    reader_state = {'error': None, 'read_time': 0.0, 'hash_time': 0.0}
+
+    def reader():
+        try:
+            with open(src, 'rb', buffering=0) as f:
+                offset = resume_offset
+                next_checkpoint = offset + checkpoint_interval
+                if offset:
+                    f.seek(offset)
+                while True:
+                    buf = free_buffers.get()
+                    if buf is None or stop.is_set():
+                        break
+                    view = memoryview(buf)
+                    start = time.perf_counter()
+                    n = f.readinto(view)
+                    reader_state['read_time'] += time.perf_counter() - start
+                    if not n:
+                        break
+                    if hasher is not None:
+                        start = time.perf_counter()
+                        hasher.update(view[:n])
+                        reader_state['hash_time'] += time.perf_counter() - start
+                    if sampler is not None:
+                        sampler.update(offset, view[:n])
+                    offset += n
+                    prefix_digest = None
+                    if checkpoint is not None and hasher is not None and offset >= next_checkpoint:
+                        prefix_digest = hasher.copy().hexdigest()
+                        next_checkpoint = offset + checkpoint_interval
+                    filled_buffers.put((buf, n, prefix_digest))
+        except Exception as e:
+            reader_state['error'] = e
+        finally:
+            filled_buffers.put(None)
+
+    reader_thread = threading.Thread(target=reader, daemon=True)
+    reader_thread.start()
+
+    size = resume_offset
+    write_time = 0.0
+    chunks = [] if keep_data and not resume_offset else None
+    if not resume_offset:
+        unlink_existing(dst)
+    try:
+        with open(dst, 'r+b' if resume_offset else 'wb') as out:
+            if resume_offset:
+                out.seek(resume_offset)
+                out.truncate()
+            while True:
+                item = filled_buffers.get()
+                if item is None:
+                    break
+                if cancel_check is not None and cancel_check():
+                    raise CopyCancelled(src)
+                buf, n, prefix_digest = item
+                start = time.perf_counter()
+                out.write(memoryview(buf)[:n])
+                size += n
+                if prefix_digest is not None:
+                    out.flush()
+                    os.fsync(out.fileno())
+                write_time += time.perf_counter() - start
+                if chunks is not None:
+                    chunks.append(bytes(memoryview(buf)[:n]))
+                free_buffers.put(buf)
+                if prefix_digest is not None:
+                    checkpoint(size, prefix_digest)
+    except BaseException:
+        stop.set()
+        free_buffers.put(None)
+        reader_thread.join()
+        raise
+
+    reader_thread.join()
+    if reader_state['error'] is not None:
+        raise reader_state['error']
+
+    shutil.copystat(src, dst)
+    digest = hasher.hexdigest() if hasher is not None else None
+    data = b''.join(chunks) if chunks is not None else None
+    return CopyResult(digest, size, reader_state['read_time'], write_time, reader_state['hash_time'],
+                      resume_offset, data)
+
+
+class FanoutResult:
+    __slots__ = ('digest', 'size', 'read_time', 'hash_time', 'write_times', 'errors', 'data')
+
+    def __init__(self, digest, size, read_time, hash_time, write_times, errors, data=None):
+        self.digest = digest
+        self.size = size
+        self.read_time = read_time
+        self.hash_time = hash_time
+        self.write_times = write_times
+        self.errors = errors
+        self.data = data
+
+    def __repr__(self):
+        return (f"FanoutResult(digest={self.digest!r}, size={self.size}, read_time={self.read_time:.3f}, "
+                f"hash_time={self.hash_time:.3f}, write_times={self.write_times}, errors={self.errors})")
+
+
+def fanout_copy(src, dsts, hash_name=DEFAULT_HASH_ALGORITHM, buffer_size=BUFFER_SIZE, ring_size=FANOUT_RING_SIZE,
+                cancel_check=None, keep_data=False, sampler=None):
+    # Reads src once and writes it to every path in dsts. Each destination
+    # has its own writer thread and queue; a buffer goes back to the free
+    # ring once all writers are done with it, so a slow destination can fall
+    # at most ring_size buffers behind before it holds up the reader (and
+    # with it the others). A destination that fails is dropped: its writer
+    # keeps releasing buffers and the others carry on. Its error is returned
+    # in result.errors (None for the destinations that succeeded).
+    free_buffers = queue.Queue()
+    buffer_size, ring_size = ring_for(file_size(src), buffer_size, ring_size)
+    for _ in range(ring_size):
+        free_buffers.put(bytearray(buffer_size))
+    queues = [queue.Queue() for _ in dsts]
+    errors = [None] * len(dsts)
+    write_times = [0.0] * len(dsts)
+    pending = {}
+    pending_lock = threading.Lock()
+
+    def release(buf):
+        with pending_lock:
+            pending[id(buf)] -= 1
+            done = pending[id(buf)] == 0
+        if done:
+            free_buffers.put(buf)
+
+    def writer(i):
+        out = None
+        try:
+            unlink_existing(dsts[i])
+            out = open(dsts[i], 'wb')
+        except Exception as e:
+            errors[i] = e
+        while True:
+            item = queues[i].get()
+            if item is None:
+                break
+            buf, n = item
+            if errors[i] is None:
+                try:
+                    start = time.perf_counter()
+                    out.write(memoryview(buf)[:n])
+                    write_times[i] += time.perf_counter() - start
+                except Exception as e:
+                    errors[i] = e
+            release(buf)
+        if out is not None:
+            try:
+                out.close()
+            except Exception as e:
+                if errors[i] is None:
+                    errors[i] = e
+
+    writer_threads = [threading.Thread(target=writer, args=(i,), daemon=True) for i in range(len(dsts))]
+    for thread in writer_threads:
+        thread.start()
+
+    hasher = new_hasher(hash_name) if hash_name else None
+    size = 0
+    read_time = 0.0
+    hash_time = 0.0
+    chunks = [] if keep_data else None
+    try:
+        with open(src, 'rb', buffering=0) as f:
+            while True:
+                if cancel_check is not None and cancel_check():
+                    raise CopyCancelled(src)
+                buf = free_buffers.get()
+                view = memoryview(buf)
+                start = time.perf_counter()
+                n = f.readinto(view)
+                read_time += time.perf_counter() - start
+                if not n:
+                    free_buffers.put(buf)
+                    break
+                if hasher is not None:
+                    start = time.perf_counter()
+                    hasher.update(view[:n])
+                    hash_time += time.perf_counter() - start
+                if chunks is not None:
+                    chunks.append(bytes(view[:n]))
+                if sampler is not None:
+                    sampler.update(size, view[:n])
+                size += n
+                with pending_lock:
+                    pending[id(buf)] = len(dsts)
+                for q in queues:
+                    q.put((buf, n))
+    finally:
+        for q in queues:
+            q.put(None)
+        for thread in writer_threads:
+            thread.join()
+
+    for i, dst in enumerate(dsts):
+        if errors[i] is None:
+            try:
+                shutil.copystat(src, dst)
+            except OSError as e:
+                errors[i] = e
+    digest = hasher.hexdigest() if hasher is not None else None
+    data = b''.join(chunks) if chunks is not None else None
+    return FanoutResult(digest, size, read_time, hash_time, write_times, errors, data)
+
+
+def resume_hasher_for(dst, offset, prefix_digest, hash_name, buffer_size=BUFFER_SIZE):
+    # Re-hash the first offset bytes already in dst (a fast local read) and
+    # check them against the digest recorded when they were copied. If they
+    # match, the returned hasher carries on as if the source had been read up
+    # to offset.
+    try:
+        st = os.stat(dst)
+        # A partial file is only ever written by the copy that resumes it;
+        # one with other links is not ours to extend
+        if st.st_size < offset or st.st_nlink > 1:
+            return None
+        hasher = new_hasher(hash_name)
+        buf = bytearray(buffer_size)
+        view = memoryview(buf)
+        remaining = offset
+        with open(dst, 'rb', buffering=0) as f:
+            while remaining > 0:
+                n = f.readinto(view[:min(buffer_size, remaining)])
+                if not n:
+                    return None
+                hasher.update(view[:n])
+                remaining -= n
+    except OSError:
+        return None
+    if hasher.hexdigest() != prefix_digest:
+        return None
+    return hasher
+
+
+def reflink(src, dst):
+    # Copy-on-write clone of src at dst. Only works on filesystems that
+    # support it (Btrfs, XFS on Linux, APFS on macOS); returns False
+    # instead of raising so callers can fall back to another method.
+    if platform.system() == 'Linux':
+        import fcntl
+        try:
+            with open(src, 'rb') as fs, open(dst, 'wb') as fd:
+                fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+            return True
+        except OSError:
+            if os.path.exists(dst):
+                os.remove(dst)
+            return False
+    if platform.system() == 'Darwin':
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+        except (OSError, AttributeError):
+            return False
+    return False
@@ -0,0 +1,140 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.manifest import scan_drive
+from utils.ingest_engine import EVENT_PROGRESS, EVENT_STATUS, EVENT_COMPLETE
+from utils.verification import MTIME_TOLERANCE
+
+# Emptying the source drives after a copy. Only files the copy verified
+# (in every destination) are deleted, and only while they still match the
+# size and mtime they were copied with; CONFIG* files (the sensor
+# settings) always stay. Unlinks run in batches on a small thread pool: on
+# FAT/exFAT every delete rewrites directory entries, and several in flight
+# keep a USB reader busy. Whatever is left on the drive afterwards is
+# listed in the report.
+WIPE_WORKERS = 8
+WIPE_BATCH = 64
+KEEP_PREFIX = "CONFIG"
+
+
+def is_kept(rel_path):
+    return os.path.basename(rel_path).startswith(KEEP_PREFIX)
+
+
+class DriveWiper:
+    def __init__(self, on_event=None, workers=WIPE_WORKERS, batch_size=WIPE_BATCH):
+        self.on_event = on_event
+        self.workers = workers
+        self.batch_size = batch_size
+        self.cancel_flag = False
+        self.lock = threading.Lock()
+
+    def emit(self, event, **data):
+        if self.on_event is not None:
+            self.on_event(event, data)
+
+    def cancel(self):
+        self.cancel_flag = True
+
+    def run(self, drives):
+        # drives: [(drive_name, manifest, verified rel_paths)]. Returns a
+        # report per drive.
+        reports = []
+        for drive_name, manifest, verified in drives:
+            if self.cancel_flag:
+                break
+            reports.append(self.wipe_drive(drive_name, manifest, verified))
+        self.emit(EVENT_COMPLETE, reports=reports, cancelled=self.cancel_flag)
+        return reports
+
+    def wipe_drive(self, drive_name, manifest, verified):
+        start_time = time.time()
+        report = {'drive': drive_name, 'root': manifest.root, 'removed': 0, 'removed_size': 0,
+                  'kept_config': [], 'unverified': [], 'changed': [], 'failed': [], 'left_behind': []}
+        to_remove = []
+        for entry in manifest:
+            if is_kept(entry.rel_path):
+                report['kept_config'].append(entry.rel_path)
+            elif entry.rel_path not in verified:
+                report['unverified'].append(entry.rel_path)
+            else:
+                to_remove.append(entry)
+
+        total = len(to_remove)
+        self.emit(EVENT_STATUS, message=f"Emptying {drive_name}: {total} verified files")
+        logging.info(f"Emptying {manifest.root}: {total} verified files, {len(report['unverified'])} not verified, "
+                     f"{len(report['kept_config'])} CONFIG files kept")
+        batches = [to_remove[i:i + self.batch_size] for i in range(0, total, self.batch_size)]
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.remove_batch, manifest, batch, report) for batch in batches]
+            for future in as_completed(futures):
+                done += future.result()
+                self.emit(EVENT_PROGRESS, percent=(done / total) * 100 if total else 100,
+                          operation=f"Emptying {drive_name}", files_done=done, files_total=total)
+
+        # Deepest directories first; anything still holding a file is
+        # left in place
+        for rel_dir in sorted(manifest.directories, key=lambda d: d.count(os.sep), reverse=True):
+            try:
+                os.rmdir(os.path.join(manifest.root, rel_dir))
+            except OSError:
+                pass
+
+        report['left_behind'] = [entry.rel_path for entry in scan_drive(manifest.root)]
+        report['elapsed'] = time.time() - start_time
+        for key in ('unverified', 'changed', 'failed'):
+            for rel_path in report[key]:
+                logging.warning(f"Not removed from {drive_name} ({key}): {rel_path}")
+        logging.info(f"Emptied {manifest.root} in {report['elapsed']:.1f}s: {report['removed']} removed, "
+                     f"{len(report['left_behind'])} files left")
+        return report
+
+    def remove_batch(self, manifest, batch, report):
+        # Returns the number of files handled
+        removed = 0
+        removed_size = 0
+        changed = []
+        failed = []
+        for entry in batch:
+            if self.cancel_flag:
+                break
+            path = manifest.source_path(entry)
+            try:
+                # A file written to since it was copied is not the file
+                # that was verified
+                st = os.stat(path)
+                if st.st_size != entry.size or abs(st.st_mtime - entry.mtime) > MTIME_TOLERANCE:
+                    changed.append(entry.rel_path)
+                    continue
+                os.remove(path)
+                removed += 1
+                removed_size += entry.size
+            except OSError as e:
+                logging.error(f"Error removing {path}: {str(e)}")
+                failed.append(entry.rel_path)
+        with self.lock:
+            report['removed'] += removed
+            report['removed_size'] += removed_size
+            report['changed'].extend(changed)
+            report['failed'].extend(failed)
+        return len(batch)
+
+
+def format_wipe_report(report):
+    lines = [f"{report['drive']}: removed {report['removed']} files"]
+    if report['kept_config']:
+        lines.append(f"  Kept {len(report['kept_config'])} CONFIG files")
+    if report['unverified']:
+        lines.append(f"  Not removed, not verified by this copy: {len(report['unverified'])} files")
+    if report['changed']:
+        lines.append(f"  Not removed, changed since the copy: {len(report['changed'])} files")
+    if report['failed']:
+        lines.append(f"  Could not remove: {len(report['failed'])} files")
+    others = len(report['left_behind']) - len(report['kept_config'])
+    if others > 0:
+        lines.append(f"  Left on the drive: {others} files besides CONFIG")
+    return lines
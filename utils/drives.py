@@ -0,0 +1,136 @@
+import hashlib
+import os
+import platform
+import threading
+
+# Removable source drives, per platform:
+#   Windows  drive letters whose type is DRIVE_REMOVABLE
+#   macOS    volumes under /Volumes other than the boot volume
+#   Linux    file systems mounted under /media, /run/media or /mnt (where
+#            udisks and most desktops mount USB drives and card readers)
+# Listing them can be slow (a GetDriveType call per letter wakes up every
+# card reader), so DriveMonitor caches the list and only enumerates again
+# when a cheap signature of the mounted drives changes: the logical drive
+# bitmask on Windows, the mount table on Linux, the /Volumes entries on
+# macOS.
+DRIVE_REMOVABLE = 2
+LINUX_MOUNTS_FILE = '/proc/self/mounts'
+LINUX_MOUNT_PREFIXES = ('/media/', '/run/media/', '/mnt/')
+# File systems that are never a sensor drive
+PSEUDO_FILESYSTEMS = frozenset(('autofs', 'tmpfs', 'devtmpfs', 'proc', 'sysfs', 'cgroup', 'cgroup2', 'overlay',
+                                'squashfs', 'nsfs', 'fuse.gvfsd-fuse', 'fuse.portal'))
+
+
+def windows_drive_mask():
+    import ctypes
+    return ctypes.windll.kernel32.GetLogicalDrives()
+
+
+def windows_removable_drives(mask=None):
+    import ctypes
+    if mask is None:
+        mask = windows_drive_mask()
+    drives = []
+    # Only letters that exist are asked for their type
+    for i in range(26):
+        if mask & (1 << i):
+            drive_name = f"{chr(ord('A') + i)}:"
+            if ctypes.windll.kernel32.GetDriveTypeW(drive_name + '\\') == DRIVE_REMOVABLE:
+                drives.append(drive_name)
+    return drives
+
+
+def mac_volume_names():
+    try:
+        return sorted(os.listdir('/Volumes'))
+    except OSError:
+        return []
+
+
+def mac_removable_drives(names=None):
+    drives = []
+    for volume in (mac_volume_names() if names is None else names):
+        path = os.path.join('/Volumes', volume)
+        # The boot volume shows up as a link to /
+        if volume == 'Macintosh HD' or os.path.realpath(path) == '/':
+            continue
+        drives.append(path)
+    return drives
+
+
+def decode_mount_path(path):
+    # The mount table escapes spaces and tabs as octal (\040)
+    return path.replace('\\040', ' ').replace('\\011', '\t').replace('\\012', '\n').replace('\\134', '\\')
+
+
+def linux_mount_table():
+    try:
+        with open(LINUX_MOUNTS_FILE, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except OSError:
+        return ''
+
+
+def linux_removable_drives(table=None):
+    drives = []
+    for line in (linux_mount_table() if table is None else table).splitlines():
+        fields = line.split()
+        if len(fields) < 3:
+            continue
+        mount_point = decode_mount_path(fields[1])
+        if fields[2] in PSEUDO_FILESYSTEMS or not mount_point.startswith(LINUX_MOUNT_PREFIXES):
+            continue
+        if mount_point not in drives:
+            drives.append(mount_point)
+    return sorted(drives)
+
+
+def drive_signature():
+    # Changes whenever a drive is plugged in or removed
+    system = platform.system()
+    if system == 'Windows':
+        return windows_drive_mask()
+    if system == 'Darwin':
+        return tuple(mac_volume_names())
+    if system == 'Linux':
+        return hashlib.md5(linux_mount_table().encode('utf-8')).hexdigest()
+    return None
+
+
+def removable_drives():
+    system = platform.system()
+    if system == 'Windows':
+        return windows_removable_drives()
+    if system == 'Darwin':
+        return mac_removable_drives()
+    if system == 'Linux':
+        return linux_removable_drives()
+    return []
+
+
+class DriveMonitor:
+    # Cached removable drive list. changed() is cheap enough to call from a
+    # UI timer; it re-enumerates only when the drive signature moved.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.signature = None
+        self.drives = None
+
+    def changed(self):
+        # True when drives were added or removed since the last call
+        signature = drive_signature()
+        with self.lock:
+            if self.drives is not None and signature == self.signature:
+                return False
+            previous = self.drives
+            self.signature = signature
+            self.drives = removable_drives()
+            return self.drives != previous
+
+    def current(self):
+        with self.lock:
+            if self.drives is not None:
+                return list(self.drives)
+        self.changed()
+        with self.lock:
+            return list(self.drives)
@@ -0,0 +1,37 @@
+import hashlib
+
+try:
+    import xxhash
+except ImportError:  # optional, much faster than the cryptographic hashes
+    xxhash = None
+
+HASH_ALGORITHMS = ('md5', 'sha256', 'blake2b', 'xxhash')
+DEFAULT_HASH_ALGORITHM = 'md5'
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def available_hash_algorithms():
+    return [name for name in HASH_ALGORITHMS if name != 'xxhash' or xxhash is not None]
+
+
+def new_hasher(hash_name):
+    if hash_name == 'xxhash':
+        if xxhash is None:
+            raise ValueError("xxhash is not installed")
+        return xxhash.xxh3_128()
+    if hash_name not in HASH_ALGORITHMS:
+        raise ValueError(f"Unsupported hash algorithm: {hash_name}")
+    return hashlib.new(hash_name)
+
+
+def file_digest(file_path, hash_name=DEFAULT_HASH_ALGORITHM, chunk_size=CHUNK_SIZE):
+    hasher = new_hasher(hash_name)
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(view)
+            if not n:
+                break
+            hasher.update(view[:n])
+    return hasher.hexdigest()
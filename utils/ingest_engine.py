@@ -0,0 +1,729 @@
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import utils.band_splitter as band_splitter
+from utils.copy_engine import CopyCancelled, fanout_copy, pipelined_copy, resume_hasher_for
+from utils.copy_backends import BACKEND_PIPELINED, DEFAULT_COPY_BACKEND, POST_HASH_MAX_SIZE, CopyBackendSelector
+from utils.mission_manifest import MissionManifest, manifest_key
+from utils.mission_catalog import MissionCatalog
+from utils.content_store import ContentStore, store_root_for
+from utils.manifest import scan_drive
+from utils.progress_bus import SpeedMeter
+from utils.concurrency import ConcurrencyTuner
+from utils.run_log import RunLog, log_report
+from utils.verification import VerificationPolicy, DeferredVerifier, verify_copy
+
+# The scan/copy/verify/band-split pipeline without any GUI. Consumers (the
+# Tk window, the command line) pass an on_event callback and receive
+# on_event(event, data) calls, where data is a dict. Events are emitted from
+# the worker threads; consumers hand them over to their own thread.
+#
+#   status      message
+#   progress    percent, operation, current_file, copied_size, total_size,
+#               speed, eta (copying) or files_done, files_total (verifying)
+#   warning     title, message
+#   drive_done  drive, stats
+#   complete    statistics, copied_size, band_stats, report, destinations,
+#               cancelled
+EVENT_STATUS = 'status'
+EVENT_PROGRESS = 'progress'
+EVENT_WARNING = 'warning'
+EVENT_DRIVE_DONE = 'drive_done'
+EVENT_COMPLETE = 'complete'
+
+# Every drive worker always has one file of its own in flight, so no drive
+# waits for another. On top of that, MAX_CONCURRENT_WRITES is the global
+# destination write budget: how many more files may be written at the same
+# time, across all drive workers.
+MAX_CONCURRENT_WRITES = 2
+
+# Files below SMALL_FILE_SIZE (the ~1.3 MB Altum captures) are copied by a
+# per-drive pool in batches, its concurrency tuned to the measured
+# throughput; anything larger (the LiDAR AVIs) streams through the pipelined
+# copy one file at a time, as the drive's own write. Every small-file stream
+# beyond the first takes a slot of the write budget per file.
+SMALL_FILE_SIZE = 16 * 1024 * 1024
+MAX_SMALL_FILE_WORKERS = 8
+SMALL_BATCH_FILES = 32
+SMALL_BATCH_BYTES = 64 * 1024 * 1024
+
+# Time spent per stage, summed over all worker threads (so read/write/hash
+# can add up to more than the wall-clock time of a concurrent run)
+STAGES = ('scan', 'read', 'write', 'hash', 'verify')
+
+OUTCOME_COPIED = 'copied'
+OUTCOME_SKIPPED = 'skipped'
+OUTCOME_FAILED = 'failed'
+
+
+def format_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size < 1024.0:
+            return f"{size:.2f} {unit}"
+        size /= 1024.0
+    return f"{size:.2f} PB"
+
+
+def format_time(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def next_mission_folder(parent_folder):
+    # First unused Mission_N folder below parent_folder (not created here)
+    counter = 1
+    while os.path.exists(os.path.join(parent_folder, f"Mission_{counter}")):
+        counter += 1
+    return os.path.join(parent_folder, f"Mission_{counter}")
+
+
+class IngestOptions:
+    def __init__(self, concurrent=True, max_concurrent_writes=MAX_CONCURRENT_WRITES, verification_policy=None,
+                 deduplicate=False, split_bands=True, band_split_bands=band_splitter.DEFAULT_BANDS,
+                 band_split_sizes=band_splitter.DEFAULT_SIZES, small_file_size=SMALL_FILE_SIZE,
+                 max_small_file_workers=MAX_SMALL_FILE_WORKERS, copy_backend=DEFAULT_COPY_BACKEND):
+        self.concurrent = concurrent
+        self.max_concurrent_writes = max_concurrent_writes
+        self.verification_policy = verification_policy or VerificationPolicy()
+        self.deduplicate = deduplicate
+        self.split_bands = split_bands
+        self.band_split_bands = tuple(band_split_bands)
+        self.band_split_sizes = tuple(band_split_sizes)
+        self.small_file_size = small_file_size
+        self.max_small_file_workers = max_small_file_workers
+        self.copy_backend = copy_backend
+
+
+class Destination:
+    # One mission folder being written. The first (primary) destination also
+    # gets the run log, content store links and band previews; backup
+    # copies only get the files and their own mission manifest. Every
+    # destination is verified and counted on its own.
+    def __init__(self, root, primary=False, policy=None):
+        policy = policy or VerificationPolicy()
+        self.root = root
+        self.primary = primary
+        self.verify_level = policy.level
+        self.confirms = policy.confirms_copies
+        self.mission_manifest = None
+        self.catalog = None
+        # Manifest keys verified in this destination during this run,
+        # including files found already verified and intact
+        self.confirmed = set()
+        # (drive_name, rel_dir) of the directories that could not be created
+        self.failed_dirs = set()
+        self.lock = threading.Lock()
+        self.stats = {'copied_files': 0, 'copied_size': 0, 'skipped_files': 0, 'failed_files': 0}
+
+    def open(self):
+        os.makedirs(self.root, exist_ok=True)
+        self.mission_manifest = MissionManifest(self.root)
+        self.catalog = MissionCatalog(self.root)
+
+    def close(self):
+        if self.mission_manifest is not None:
+            self.mission_manifest.close()
+        if self.catalog is not None:
+            self.catalog.close()
+
+    def make_tree(self, drive_name, directories):
+        # A directory that cannot be created fails only the files in it
+        for rel_dir in [''] + list(directories):
+            path = os.path.join(self.root, drive_name, rel_dir)
+            try:
+                os.makedirs(path, exist_ok=True)
+            except OSError as e:
+                logging.error(f"Cannot create {path}: {str(e)}")
+                self.failed_dirs.add((drive_name, rel_dir))
+
+    def has_folder_for(self, drive_name, rel_path):
+        return (drive_name, os.path.dirname(rel_path)) not in self.failed_dirs
+
+    def record_verified(self, key, drive_name, entry, digest, hash_name):
+        self.mission_manifest.record_verified(key, entry, digest, hash_name, self.verify_level)
+        self.catalog.record(drive_name, entry, digest, hash_name)
+        if self.confirms:
+            self.confirmed.add(key)
+
+    def path_for(self, drive_name, rel_path):
+        return os.path.join(self.root, drive_name, rel_path)
+
+    def count(self, outcome, size=0):
+        with self.lock:
+            self.stats[f"{outcome}_files"] += 1
+            if outcome == OUTCOME_COPIED:
+                self.stats['copied_size'] += size
+
+    def verification_failed(self, size):
+        # A copy counted as copied that failed deferred verification
+        with self.lock:
+            self.stats['copied_files'] -= 1
+            self.stats['copied_size'] -= size
+            self.stats['failed_files'] += 1
+
+
+class IngestEngine:
+    def __init__(self, options=None, on_event=None):
+        self.options = options or IngestOptions()
+        self.on_event = on_event
+        self.verification_policy = self.options.verification_policy
+        self.cancel_flag = False
+        self.progress_lock = threading.Lock()
+        self.manifests = {}
+        self.devices = {}
+        self.total_size = 0
+        self.copied_size = 0
+        self.speed_meter = None
+        self.stage_times = dict.fromkeys(STAGES, 0.0)
+        self.write_slots = None
+        self.deferred_verifier = None
+        self.destinations = []
+        self.mission_manifest = None
+        self.content_store = None
+        self.band_stream = None
+        self.band_stats = None
+        self.run_log = None
+        self.report = None
+
+    def emit(self, event, **data):
+        if self.on_event is not None:
+            self.on_event(event, data)
+
+    def update_status(self, message):
+        self.emit(EVENT_STATUS, message=message)
+
+    def cancel(self):
+        self.cancel_flag = True
+
+    def scan(self, source_drives):
+        # Scan every drive once; the manifests are reused for copying,
+        # progress, the statistics and emptying the drives.
+        self.manifests = {}
+        total_size = 0
+        start_time = time.perf_counter()
+        for drive_name, drive in source_drives.items():
+            if drive:
+                self.update_status(f"Scanning {drive_name}...")
+                manifest = scan_drive(drive)
+                self.manifests[drive_name] = manifest
+                self.devices[drive_name] = f"{drive} (dev {os.stat(drive).st_dev:#x})"
+                total_size += manifest.total_size
+                logging.info(f"Drive {drive} size: {format_size(manifest.total_size)} ({len(manifest)} files)")
+        self.add_stage_time('scan', time.perf_counter() - start_time)
+        logging.info(f"Total size to copy: {format_size(total_size)}")
+        self.total_size = total_size
+        return self.manifests
+
+    def run(self, source_drives, destination):
+        # destination is a mission folder or a list of them; every source
+        # file is read once and written to all of them. Returns the
+        # per-drive statistics (of the first destination), or None when
+        # cancelled.
+        roots = [destination] if isinstance(destination, str) else list(destination)
+        destination = roots[0]
+        self.stage_times = dict.fromkeys(STAGES, 0.0)
+        self.scan(source_drives)
+        self.copied_size = 0
+        self.speed_meter = SpeedMeter()
+        self.speed_meter.update(0)
+        self.write_slots = threading.BoundedSemaphore(self.options.max_concurrent_writes)
+        self.copy_backends = CopyBackendSelector(self.options.copy_backend)
+        policy = self.verification_policy
+        self.deferred_verifier = None
+        if policy.deferred and policy.reads_destination:
+            self.deferred_verifier = DeferredVerifier(policy)
+        logging.info(f"Verification: {policy}")
+
+        # Files verified by an earlier (interrupted) run into a mission
+        # folder are skipped there; large files resume from their last
+        # checkpoint.
+        self.destinations = [Destination(root, primary=(i == 0), policy=policy)
+                             for i, root in enumerate(roots)]
+        for dest in self.destinations:
+            dest.open()
+        self.mission_manifest = self.destinations[0].mission_manifest
+        if len(self.destinations) > 1:
+            logging.info(f"Copying to {len(self.destinations)} destinations: {', '.join(roots)}")
+        # Per-file timings and the end-of-run report
+        self.run_log = RunLog(destination)
+        self.content_store = None
+        if self.options.deduplicate:
+            self.content_store = ContentStore(store_root_for(destination), policy.hash_name)
+        # Band images are split while the copy is still running
+        self.band_stream = None
+        self.band_stats = None
+        if self.options.split_bands and source_drives.get("Altum"):
+            self.band_stream = band_splitter.StreamingBandSplitter(
+                os.path.join(destination, "Altum"),
+                bands=self.options.band_split_bands,
+                sizes=self.options.band_split_sizes)
+        try:
+            statistics = self.copy_selected_drives(source_drives)
+        finally:
+            if self.cancel_flag and self.band_stream is not None:
+                self.band_stream.close(cancel=True)
+            for dest in self.destinations:
+                dest.close()
+                logging.info(f"Destination {dest.root}: {dest.stats}")
+            self.run_log.record_probes(self.copy_backends.probes)
+            self.report = self.run_log.close()
+            log_report(self.report)
+            if self.content_store is not None:
+                self.content_store.save_index()
+                logging.info(f"Linked {self.content_store.linked_files} files "
+                             f"({format_size(self.content_store.linked_size)}) from earlier missions")
+
+        if self.cancel_flag:
+            self.emit(EVENT_COMPLETE, statistics=None, copied_size=self.copied_size, band_stats=None,
+                      report=self.report, destinations=self.destination_stats(), cancelled=True)
+            return None
+
+        copied_size = self.copied_size
+        self.update_status("Copy process completed.")
+        self.emit(EVENT_PROGRESS, percent=100, operation="Copy process completed", current_file="",
+                  copied_size=copied_size, total_size=self.total_size, speed=None, eta=None)
+        logging.info(f"Copy process completed. Total copied: {format_size(copied_size)}")
+
+        # Wait for the band images still being processed
+        if self.band_stream is not None:
+            self.update_status("Finishing band splitting...")
+            try:
+                self.band_stats = self.band_stream.close()
+                logging.info(f"Band splitting completed. Stats: {self.band_stats}")
+                self.update_status(f"Band splitting completed: {self.band_stats['processed']} images, "
+                                   f"{self.band_stats['errors']} errors.")
+            except Exception as e:
+                self.update_status(f"Error during band splitting: {str(e)}")
+                logging.error(f"Error during band splitting: {str(e)}")
+
+        self.emit(EVENT_COMPLETE, statistics=statistics, copied_size=copied_size, band_stats=self.band_stats,
+                  report=self.report, destinations=self.destination_stats(), cancelled=False)
+        return statistics
+
+    def verified_paths(self, drive_name):
+        # Relative paths of the drive's files that this run confirmed in
+        # every destination; only these may be wiped from the source.
+        # Nothing is confirmed when the copies were not verified at all.
+        manifest = self.manifests.get(drive_name)
+        if manifest is None or not self.destinations or not self.verification_policy.confirms_copies:
+            return set()
+        return {entry.rel_path for entry in manifest
+                if all(manifest_key(drive_name, entry.rel_path) in dest.confirmed for dest in self.destinations)}
+
+    def destination_stats(self):
+        return {dest.root: dict(dest.stats) for dest in self.destinations}
+
+    def copy_selected_drives(self, source_drives):
+        statistics = {}
+        selected_drives = {name: path for name, path in source_drives.items() if path}
+        if self.options.concurrent and len(selected_drives) > 1:
+            # One worker per source drive; the drives are separate USB devices
+            # so they can be read in parallel.
+            logging.info(f"Copying {len(selected_drives)} drives concurrently")
+            with ThreadPoolExecutor(max_workers=len(selected_drives)) as executor:
+                futures = {executor.submit(self.copy_drive, drive_name, self.manifests[drive_name]): drive_name
+                           for drive_name in selected_drives}
+                results = {}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+            # Keep the statistics in drive order rather than completion order
+            for drive_name in selected_drives:
+                if results.get(drive_name) is not None:
+                    statistics[drive_name] = results[drive_name]
+        else:
+            for drive_name in selected_drives:
+                if self.cancel_flag:
+                    break
+                drive_stats = self.copy_drive(drive_name, self.manifests[drive_name])
+                if drive_stats is not None:
+                    statistics[drive_name] = drive_stats
+
+        if self.deferred_verifier is not None and not self.cancel_flag:
+            self.run_deferred_verification(statistics)
+        return statistics
+
+    def copy_drive(self, drive_name, manifest):
+        # The destination trees are created once up front instead of per file
+        for dest in self.destinations:
+            dest.make_tree(drive_name, manifest.directories)
+
+        try:
+            self.update_status(f"Preparing to copy files from {drive_name}")
+            drive_stats = {'total_files': len(manifest), 'copied_files': 0,
+                           'total_size': manifest.total_size, 'copied_size': 0, 'skipped_files': 0}
+            # The tuner finds out by itself when streams waiting for a slot
+            # stop adding throughput
+            tuner = ConcurrencyTuner(self.options.max_small_file_workers)
+            batch = []
+            batch_size = 0
+
+            with ThreadPoolExecutor(max_workers=tuner.max_workers) as executor:
+                for entry in manifest:
+                    if self.cancel_flag:
+                        return None
+
+                    if entry.size < self.options.small_file_size:
+                        batch.append(entry)
+                        batch_size += entry.size
+                        if len(batch) < SMALL_BATCH_FILES and batch_size < SMALL_BATCH_BYTES:
+                            continue
+                        self.copy_small_batch(executor, tuner, drive_name, manifest, batch, drive_stats)
+                        batch = []
+                        batch_size = 0
+                        continue
+
+                    # Keep the copy order: pending small files go first
+                    if batch:
+                        self.copy_small_batch(executor, tuner, drive_name, manifest, batch, drive_stats)
+                        batch = []
+                        batch_size = 0
+                    # Large files stream one at a time, as the drive's own
+                    # write
+                    outcome = self.copy_entry(drive_name, manifest, entry)
+                    self.tally(drive_stats, entry, outcome)
+
+                if batch and not self.cancel_flag:
+                    self.copy_small_batch(executor, tuner, drive_name, manifest, batch, drive_stats)
+
+            if self.cancel_flag:
+                return None
+            logging.info(f"Completed copying {drive_name}. Stats: {drive_stats}")
+            self.update_status(f"Files from {drive_name} copied successfully.")
+            self.emit(EVENT_DRIVE_DONE, drive=drive_name, stats=drive_stats)
+            return drive_stats
+        except CopyCancelled:
+            return None
+        except Exception as e:
+            logging.error(f"Error copying files from {drive_name}: {str(e)}")
+            self.update_status(f"Error copying files from {drive_name}: {str(e)}")
+            return None
+
+    def copy_small_batch(self, executor, tuner, drive_name, manifest, batch, drive_stats):
+        # The batch is dealt out to `concurrency` streams that each copy
+        # their share in order; the time the whole batch took tunes the
+        # concurrency for the next one. The first stream is the drive's own
+        # write; the others take slots from the shared write budget.
+        workers = tuner.concurrency
+        start_time = time.monotonic()
+        if workers <= 1:
+            results = zip(batch, self.copy_entries(drive_name, manifest, batch))
+        else:
+            shares = [batch[i::workers] for i in range(workers)]
+            futures = [executor.submit(self.copy_entries, drive_name, manifest, share,
+                                       self.write_slots if i else None)
+                       for i, share in enumerate(shares)]
+            results = []
+            for share, future in zip(shares, futures):
+                results.extend(zip(share, future.result()))
+        elapsed = time.monotonic() - start_time
+
+        copied_size = 0
+        for entry, outcome in results:
+            self.tally(drive_stats, entry, outcome)
+            if outcome == OUTCOME_COPIED:
+                copied_size += entry.size
+        # Files skipped by the mission manifest say nothing about throughput
+        tuner.record(copied_size, elapsed)
+
+    def copy_entries(self, drive_name, manifest, entries, write_slot=None):
+        outcomes = []
+        for entry in entries:
+            if self.cancel_flag:
+                raise CopyCancelled()
+            outcomes.append(self.copy_entry(drive_name, manifest, entry, write_slot))
+        return outcomes
+
+    def copy_entry(self, drive_name, manifest, entry, write_slot=None):
+        # Returns one of the OUTCOME_* values; CopyCancelled propagates
+        src_file = manifest.source_path(entry)
+        rel_path = entry.rel_path
+        key = manifest_key(drive_name, rel_path)
+        hash_name = self.source_hash_name()
+        start = time.time()
+        start_time = time.perf_counter()
+        timing = {}
+
+        # Destinations that already hold a verified copy from an earlier
+        # run are left alone; the rest are written in one pass
+        targets = []
+        primary = self.destinations[0]
+        for dest in self.destinations:
+            if not dest.has_folder_for(drive_name, rel_path):
+                dest.count(OUTCOME_FAILED)
+                continue
+            record = dest.mission_manifest.completed(key, entry, dest.path_for(drive_name, rel_path), hash_name,
+                                                     dest.verify_level)
+            if record is None:
+                targets.append(dest)
+            else:
+                entry.digest = record.get('digest')
+                dest.count(OUTCOME_SKIPPED)
+                # completed() has checked the earlier verification covers
+                # this run's and the destination's size is unchanged
+                if dest.confirms:
+                    dest.confirmed.add(key)
+                # Keeps the catalog complete for missions copied before it
+                # existed
+                dest.catalog.record(drive_name, entry, entry.digest, record.get('hash'))
+        timing['stat'] = time.perf_counter() - start_time
+        # Without its folder in the primary destination the file counts as
+        # failed, even where the other destinations get it
+        primary_folder = primary.has_folder_for(drive_name, rel_path)
+        if primary_folder and primary not in targets:
+            self.queue_band_split(drive_name, primary.path_for(drive_name, rel_path))
+        if not targets and primary_folder:
+            self.add_copied_size(entry.size)
+            self.record_file(drive_name, entry, OUTCOME_SKIPPED, start, start_time, timing)
+            self.report_progress(drive_name, rel_path)
+            return OUTCOME_SKIPPED
+
+        outcome = OUTCOME_FAILED
+        try:
+            # Copy file and verify checksum
+            if targets:
+                with write_slot or nullcontext():
+                    copied = self.copy_and_verify(src_file, drive_name, entry, targets, timing)
+                if copied:
+                    outcome = OUTCOME_COPIED
+                    self.add_copied_size(entry.size)
+                else:
+                    logging.error(f"Failed to copy or verify: {src_file}")
+        except CopyCancelled:
+            raise
+        except Exception as e:
+            logging.error(f"Error copying file {src_file}: {str(e)}")
+            for dest in targets:
+                dest.count(OUTCOME_FAILED)
+        if not primary_folder:
+            outcome = OUTCOME_FAILED
+
+        if len(self.destinations) > 1:
+            timing['destinations'] = len(targets)
+        self.record_file(drive_name, entry, outcome, start, start_time, timing)
+        self.report_progress(drive_name, rel_path)
+        return outcome
+
+    def record_file(self, drive_name, entry, outcome, start, start_time, timing):
+        with self.progress_lock:
+            for stage in ('read', 'write', 'hash', 'verify'):
+                self.stage_times[stage] += timing.get(stage, 0.0)
+        # a resumed copy only moved the part after resumed_from
+        record = {'drive': drive_name, 'path': entry.rel_path.replace(os.sep, '/'), 'size': entry.size,
+                  'bytes': entry.size - timing.get('resumed_from', 0), 'device': self.devices.get(drive_name), 'outcome': outcome, 'start': start,
+                  'elapsed': time.perf_counter() - start_time}
+        record.update(timing)
+        self.run_log.record_file(record)
+
+    def tally(self, drive_stats, entry, outcome):
+        if outcome == OUTCOME_FAILED:
+            return
+        drive_stats['copied_files'] += 1
+        drive_stats['copied_size'] += entry.size
+        if outcome == OUTCOME_SKIPPED:
+            drive_stats['skipped_files'] += 1
+
+    def add_copied_size(self, size):
+        with self.progress_lock:
+            self.copied_size += size
+
+    def add_stage_time(self, stage, seconds):
+        with self.progress_lock:
+            self.stage_times[stage] += seconds
+
+    def report_progress(self, drive_name, rel_path):
+        # Progress is computed from the combined total of all drives; speed
+        # and ETA from the recent transfer rate
+        with self.progress_lock:
+            copied_size = self.copied_size
+            total_size = self.total_size
+            progress = (copied_size / total_size) * 100 if total_size > 0 else 100
+            speed = self.speed_meter.update(copied_size)
+            eta = self.speed_meter.eta(total_size - copied_size)
+
+            self.emit(EVENT_PROGRESS, percent=progress, operation=f"Copying {drive_name}", current_file=rel_path,
+                      copied_size=copied_size, total_size=total_size, speed=speed, eta=eta)
+
+    def source_hash_name(self):
+        # The source digest is needed for full verification and to key
+        # files in the content store
+        policy = self.verification_policy
+        if policy.needs_source_digest or self.content_store is not None:
+            return policy.hash_name
+        return None
+
+    def queue_band_split(self, drive_name, dst, data=None):
+        if self.band_stream is not None and drive_name == "Altum" and self.band_stream.wants(dst):
+            self.band_stream.submit(dst, data)
+
+    def copy_and_verify(self, src, drive_name, entry, targets, timing=None):
+        # Copies src to every destination in targets and verifies each copy;
+        # True when all of them succeeded. timing, when given, receives the
+        # read/write/hash/verify durations.
+        policy = self.verification_policy
+        self.update_status(f"Copying: {os.path.basename(src)}")
+        # The source digest is computed while copying, so the (slow) source
+        # is only read once; only the destinations are re-read to verify.
+        hash_name = self.source_hash_name()
+        key = manifest_key(drive_name, entry.rel_path)
+
+        primary = targets[0] if targets[0].primary else None
+        if self.content_store is not None and primary is not None and \
+                (hash_name is None or primary.mission_manifest.checkpoint(key, entry, hash_name) is None):
+            dst = primary.path_for(drive_name, entry.rel_path)
+            digest = self.content_store.link_known(entry, src, dst, verify_source=policy.needs_source_digest)
+            if digest is not None:
+                entry.digest = digest
+                primary.record_verified(key, drive_name, entry, digest, hash_name)
+                primary.count(OUTCOME_COPIED, entry.size)
+                if timing is not None:
+                    timing['linked'] = True
+                self.queue_band_split(drive_name, dst)
+                targets = targets[1:]
+                if not targets:
+                    return True
+
+        if len(targets) == 1:
+            return self.copy_to_destination(src, drive_name, entry, targets[0], key, hash_name, timing)
+        return self.copy_to_destinations(src, drive_name, entry, targets, key, hash_name, timing)
+
+    def copy_to_destination(self, src, drive_name, entry, dest, key, hash_name, timing):
+        dst = dest.path_for(drive_name, entry.rel_path)
+        resume_offset = 0
+        resume_hasher = None
+        save_checkpoint = None
+        if hash_name is not None:
+            saved = dest.mission_manifest.checkpoint(key, entry, hash_name)
+            if saved is not None:
+                resume_hasher = resume_hasher_for(dst, saved[0], saved[1], hash_name)
+                if resume_hasher is not None:
+                    resume_offset = saved[0]
+                    logging.info(f"Resuming {src} from {format_size(resume_offset)}")
+
+            def save_checkpoint(offset, prefix_digest):
+                dest.mission_manifest.record_checkpoint(key, entry, offset, prefix_digest, hash_name)
+
+        keep_data = self.wants_band_data(drive_name, dest, dst)
+        needs_checkpoints = save_checkpoint is not None and entry.size > POST_HASH_MAX_SIZE
+        sampler = self.verification_policy.sampler_for(entry.size)
+        if resume_hasher is None and not keep_data and not needs_checkpoints:
+            backend, result = self.copy_backends.copy(src, dst, entry.size, hash_name,
+                                                      cancel_check=lambda: self.cancel_flag, sampler=sampler)
+        else:
+            # Resuming, checkpoints and handing the data to the band splitter
+            # need the user-space copy
+            backend = BACKEND_PIPELINED
+            result = pipelined_copy(src, dst, hash_name=hash_name, cancel_check=lambda: self.cancel_flag,
+                                    resume_offset=resume_offset, resume_hasher=resume_hasher,
+                                    checkpoint=save_checkpoint, keep_data=keep_data, sampler=sampler)
+        entry.digest = result.digest
+        if timing is not None:
+            timing.update(read=result.read_time, write=result.write_time, hash=result.hash_time, backend=backend)
+            if result.resumed_from:
+                timing['resumed_from'] = result.resumed_from
+        return self.finish_copy(src, dst, dest, drive_name, entry, key, hash_name, result.digest, result.data,
+                                timing, sampler.digest() if sampler is not None else None)
+
+    def copy_to_destinations(self, src, drive_name, entry, targets, key, hash_name, timing):
+        # One read of the source, written to all targets at once. A target
+        # that fails to write is counted as failed there; the others go on.
+        dsts = [dest.path_for(drive_name, entry.rel_path) for dest in targets]
+        sampler = self.verification_policy.sampler_for(entry.size)
+        result = fanout_copy(src, dsts, hash_name=hash_name, cancel_check=lambda: self.cancel_flag,
+                             keep_data=self.wants_band_data(drive_name, targets[0], dsts[0]), sampler=sampler)
+        sample_digest = sampler.digest() if sampler is not None else None
+        entry.digest = result.digest
+        if timing is not None:
+            # The writers run in parallel; the slowest one is what counts
+            timing.update(read=result.read_time, write=max(result.write_times), hash=result.hash_time,
+                          backend='fanout')
+        copied = True
+        for dest, dst, error in zip(targets, dsts, result.errors):
+            if error is not None:
+                logging.error(f"Error writing {dst}: {str(error)}")
+                dest.count(OUTCOME_FAILED)
+                copied = False
+            elif not self.finish_copy(src, dst, dest, drive_name, entry, key, hash_name, result.digest,
+                                      result.data, timing, sample_digest):
+                copied = False
+        return copied
+
+    def wants_band_data(self, drive_name, dest, dst):
+        # With deferred verification the band images are only queued once
+        # verified, long after the copy; keeping their bytes until then
+        # would only cost memory and force the pipelined copy
+        return (dest.primary and self.deferred_verifier is None and self.band_stream is not None
+                and drive_name == "Altum" and self.band_stream.wants(dst))
+
+    def finish_copy(self, src, dst, dest, drive_name, entry, key, hash_name, digest, data, timing,
+                    sample_digest=None):
+        # digest and sample_digest were taken from the source during the
+        # copy, so verifying only reads the destination
+        policy = self.verification_policy
+        if self.deferred_verifier is not None:
+            dest.count(OUTCOME_COPIED, entry.size)
+            self.deferred_verifier.add(src, dst, digest, (drive_name, entry.size, key, entry, dest), sample_digest)
+            return True
+
+        if policy.reads_destination:
+            self.update_status(f"Verifying: {os.path.basename(dst)}")
+        start_time = time.perf_counter()
+        verified = verify_copy(src, dst, policy.level, policy.hash_name, digest, sample_digest=sample_digest)
+        if timing is not None:
+            timing['verify'] = timing.get('verify', 0.0) + time.perf_counter() - start_time
+        if not verified:
+            dest.count(OUTCOME_FAILED)
+            self.emit(EVENT_WARNING, title="Checksum Mismatch", message=f"Checksum mismatch for file: {dst}")
+            return False
+        dest.record_verified(key, drive_name, entry, digest, hash_name)
+        dest.count(OUTCOME_COPIED, entry.size)
+        if dest.primary:
+            # Only copies whose data was read back go into the store
+            if self.content_store is not None and dest.confirms:
+                self.content_store.add(entry, dst, digest)
+            self.queue_band_split(drive_name, dst, data)
+        return True
+
+    def run_deferred_verification(self, statistics):
+        total = len(self.deferred_verifier)
+        logging.info(f"Verifying {total} copied files")
+
+        def on_progress(done, total, dst):
+            self.emit(EVENT_PROGRESS, percent=(done / total) * 100 if total > 0 else 100,
+                      operation="Verifying copied files", current_file=os.path.basename(dst),
+                      files_done=done, files_total=total)
+
+        hash_name = self.source_hash_name()
+
+        def on_verified(src, dst, tag):
+            drive_name, size, key, entry, dest = tag
+            dest.record_verified(key, drive_name, entry, entry.digest, hash_name)
+            if dest.primary:
+                if self.content_store is not None:
+                    self.content_store.add(entry, dst, entry.digest)
+                self.queue_band_split(drive_name, dst)
+
+        start_time = time.perf_counter()
+        failures = self.deferred_verifier.run(on_progress, lambda: self.cancel_flag, on_verified)
+        elapsed = time.perf_counter() - start_time
+        self.add_stage_time('verify', elapsed)
+        self.run_log.record_stage('verify', elapsed)
+        # A file counts as failed once, however many of its copies failed
+        failed_keys = set()
+        for src, dst, (drive_name, size, key, entry, dest) in failures:
+            logging.error(f"Failed to copy or verify: {src} -> {dst}")
+            dest.verification_failed(size)
+            if key in failed_keys:
+                continue
+            failed_keys.add(key)
+            drive_stats = statistics.get(drive_name)
+            if drive_stats is not None:
+                drive_stats['copied_files'] -= 1
+                drive_stats['copied_size'] -= size
+            self.add_copied_size(-size)
+        if failures:
+            self.emit(EVENT_WARNING, title="Checksum Mismatch",
+                      message=f"{len(failures)} file(s) failed verification. See copy_log.txt for details.")
@@ -0,0 +1,65 @@
+import logging
+import os
+
+
+class ManifestEntry:
+    __slots__ = ('rel_path', 'size', 'mtime', 'digest')
+
+    def __init__(self, rel_path, size, mtime, digest=None):
+        self.rel_path = rel_path
+        self.size = size
+        self.mtime = mtime
+        self.digest = digest
+
+    def __repr__(self):
+        return f"ManifestEntry({self.rel_path!r}, size={self.size}, mtime={self.mtime}, digest={self.digest!r})"
+
+
+class DriveManifest:
+    # Everything we need to know about a source drive, gathered in a single
+    # scan: sizing, copying, progress, the statistics window and emptying the
+    # drive all work from this instead of walking the drive again.
+    def __init__(self, root, entries, directories):
+        self.root = root
+        self.entries = entries
+        self.directories = directories
+        self.total_size = sum(entry.size for entry in entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def source_path(self, entry):
+        return os.path.join(self.root, entry.rel_path)
+
+
+def scan_drive(drive_path):
+    entries = []
+    directories = []
+    # Iterative so deep trees cannot hit the recursion limit; DirEntry.stat()
+    # is served from the directory listing on Windows and costs a single
+    # stat call elsewhere.
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(drive_path, rel_dir)) as it:
+                for dir_entry in it:
+                    rel_path = os.path.join(rel_dir, dir_entry.name) if rel_dir else dir_entry.name
+                    try:
+                        if dir_entry.is_dir(follow_symlinks=False):
+                            directories.append(rel_path)
+                            stack.append(rel_path)
+                        elif dir_entry.is_file():
+                            st = dir_entry.stat()
+                            entries.append(ManifestEntry(rel_path, st.st_size, st.st_mtime))
+                    except OSError as e:
+                        logging.warning(f"Skipping {dir_entry.path}: {str(e)}")
+        except OSError as e:
+            # Same as os.walk: unreadable directories are skipped
+            logging.warning(f"Cannot scan {os.path.join(drive_path, rel_dir)}: {str(e)}")
+    entries.sort(key=lambda entry: entry.rel_path)
+    directories.sort()
+    return DriveManifest(drive_path, entries, directories)
@@ -0,0 +1,180 @@
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from utils.band_splitter import parse_capture_name
+
+CATALOG_FILENAME = '.mission_catalog.sqlite'
+# Rows are written in batches; a crash loses at most this many, and they
+# are recorded again by the next ingest (verified files are re-cataloged
+# when they are skipped)
+COMMIT_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    sensor TEXT NOT NULL,
+    flight TEXT,
+    folder TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    digest TEXT,
+    hash TEXT,
+    capture_id TEXT,
+    band INTEGER,
+    cataloged REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_sensor ON files (sensor);
+CREATE INDEX IF NOT EXISTS files_capture ON files (sensor, folder, capture_id);
+CREATE INDEX IF NOT EXISTS files_band ON files (band);
+"""
+
+
+def catalog_path_for(mission_folder):
+    return os.path.join(mission_folder, CATALOG_FILENAME)
+
+
+def catalog_row(drive_name, entry, digest, hash_name, now):
+    # path is the mission-relative path with '/' separators, the same as the
+    # mission manifest key. flight is the top-level folder on the drive
+    # (SYNCxxxxSET for the Altum, DCIM for the cameras).
+    rel_path = entry.rel_path.replace(os.sep, '/')
+    folder, _, file_name = rel_path.rpartition('/')
+    flight = rel_path.split('/', 1)[0] if folder else None
+    capture_id = band = None
+    parsed = parse_capture_name(file_name)
+    if parsed is not None:
+        capture_id, band = parsed
+    return (f"{drive_name}/{rel_path}", drive_name, flight, folder, entry.size, entry.mtime, digest, hash_name,
+            capture_id, band, now)
+
+
+class MissionCatalog:
+    # SQLite index of the files verified into a mission folder, written
+    # during the copy: path, sensor, size, mtime and digest, plus the capture
+    # id and band parsed from Altum IMG_xxxx_N.tif names. Answers questions
+    # about a mission (totals per sensor, which captures have every band,
+    # the band files of one flight) without walking the disk again. A
+    # re-ingest updates rows in place.
+    def __init__(self, mission_folder):
+        self.mission_folder = mission_folder
+        self.path = catalog_path_for(mission_folder)
+        self.lock = threading.Lock()
+        self.pending = []
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def record(self, drive_name, entry, digest=None, hash_name=None):
+        row = catalog_row(drive_name, entry, digest, hash_name, time.time())
+        with self.lock:
+            self.pending.append(row)
+            if len(self.pending) >= COMMIT_EVERY:
+                self.flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                        self.pending)
+        self.pending = []
+
+    def close(self):
+        with self.lock:
+            try:
+                self.flush_locked()
+            finally:
+                self.connection.close()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            self.flush_locked()
+            return self.connection.execute(sql, params).fetchall()
+
+    def __len__(self):
+        return self.query('SELECT COUNT(*) FROM files')[0][0]
+
+    def sensor_totals(self):
+        # {sensor: (files, bytes)}
+        rows = self.query('SELECT sensor, COUNT(*), SUM(size) FROM files GROUP BY sensor ORDER BY sensor')
+        return {sensor: (count, size) for sensor, count, size in rows}
+
+    def band_files(self, bands, sensor='Altum', flight=None):
+        # [(folder, capture_id, band, path)] for the given bands, optionally
+        # of a single flight; paths are absolute
+        marks = ', '.join('?' * len(bands))
+        sql = f'SELECT folder, capture_id, band, path FROM files WHERE sensor = ? AND band IN ({marks})'
+        params = [sensor] + list(bands)
+        if flight is not None:
+            sql += ' AND flight = ?'
+            params.append(flight)
+        sql += ' ORDER BY folder, capture_id, band'
+        return [(folder, capture_id, band, self.absolute_path(path))
+                for folder, capture_id, band, path in self.query(sql, params)]
+
+    def complete_captures(self, band_count, sensor='Altum'):
+        # Captures with all band_count bands: [(folder, capture_id)]
+        return self.query('SELECT folder, capture_id FROM files WHERE sensor = ? AND capture_id IS NOT NULL '
+                          'GROUP BY folder, capture_id HAVING COUNT(DISTINCT band) >= ? '
+                          'ORDER BY folder, capture_id', (sensor, band_count))
+
+    def incomplete_captures(self, band_count, sensor='Altum'):
+        # [(folder, capture_id, bands present)]
+        rows = self.query('SELECT folder, capture_id, GROUP_CONCAT(band) FROM files '
+                          'WHERE sensor = ? AND capture_id IS NOT NULL '
+                          'GROUP BY folder, capture_id HAVING COUNT(DISTINCT band) < ? '
+                          'ORDER BY folder, capture_id', (sensor, band_count))
+        return [(folder, capture_id, sorted(int(band) for band in bands.split(',')))
+                for folder, capture_id, bands in rows]
+
+    def absolute_path(self, path):
+        return os.path.join(self.mission_folder, *path.split('/'))
+
+
+def open_catalog(mission_folder):
+    # The catalog of an existing mission, or None when it has none
+    if not os.path.exists(catalog_path_for(mission_folder)):
+        return None
+    try:
+        return MissionCatalog(mission_folder)
+    except sqlite3.Error as e:
+        logging.warning(f"Cannot open the mission catalog in {mission_folder}: {str(e)}")
+        return None
+
+
+def main(argv=None):
+    # python -m utils.mission_catalog <mission folder> [band count]
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Usage: python -m utils.mission_catalog <mission folder> [band count]")
+        return 2
+    catalog = open_catalog(argv[0])
+    if catalog is None:
+        print(f"No catalog in {argv[0]}")
+        return 1
+    band_count = int(argv[1]) if len(argv) > 1 else 5
+    try:
+        for sensor, (count, size) in catalog.sensor_totals().items():
+            print(f"{sensor}: {count} files, {size / (1024 * 1024):.1f} MB")
+        complete = catalog.complete_captures(band_count)
+        incomplete = catalog.incomplete_captures(band_count)
+        if complete or incomplete:
+            print(f"Altum captures with all {band_count} bands: {len(complete)}, incomplete: {len(incomplete)}")
+            for folder, capture_id, bands in incomplete:
+                print(f"  {folder}/{capture_id}: bands {', '.join(str(band) for band in bands)}")
+    finally:
+        catalog.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+import threading
+
+from utils.verification import MTIME_TOLERANCE, VERIFY_NONE, level_covers
+
+MANIFEST_FILENAME = '.copy_manifest.jsonl'
+
+STATUS_VERIFIED = 'verified'
+# Copied with verification turned off
+STATUS_COPIED = 'copied'
+STATUS_PARTIAL = 'partial'
+
+
+def manifest_key(drive_name, rel_path):
+    return f"{drive_name}/{rel_path.replace(os.sep, '/')}"
+
+
+class MissionManifest:
+    # Append-only JSON-lines record of what has been copied into a mission
+    # folder. Every line is one record; the last record for a key wins, so an
+    # interrupted run leaves at worst a truncated final line behind.
+    def __init__(self, destination):
+        self.path = os.path.join(destination, MANIFEST_FILENAME)
+        self.records = {}
+        self.lock = threading.Lock()
+        line_count = self.load()
+        if line_count > 2 * len(self.records) + 100:
+            self.compact()
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def load(self):
+        line_count = 0
+        if not os.path.exists(self.path):
+            return line_count
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line_count += 1
+                try:
+                    record = json.loads(line)
+                    self.records[record['key']] = record
+                except (ValueError, KeyError):
+                    logging.warning(f"Ignoring damaged line {line_count} in {self.path}")
+        return line_count
+
+    def compact(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in self.records.values():
+                f.write(json.dumps(record) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def write(self, record):
+        with self.lock:
+            self.records[record['key']] = record
+            self.file.write(json.dumps(record) + '\n')
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+    def source_matches(self, record, entry, hash_name):
+        return (record['size'] == entry.size
+                and abs(record['mtime'] - entry.mtime) <= MTIME_TOLERANCE
+                and (hash_name is None or record.get('hash') == hash_name))
+
+    def completed(self, key, entry, dst, hash_name=None, level=VERIFY_NONE):
+        # A file can be skipped when an earlier run copied it and checked it
+        # at least as thoroughly as `level` asks for, the source has not
+        # changed since and the destination is still intact. With hash_name
+        # set the earlier run must have hashed with the same algorithm, so
+        # the recorded digest stays meaningful. Records from before the
+        # level was stored count as unverified.
+        record = self.records.get(key)
+        if record is None or record['status'] not in (STATUS_VERIFIED, STATUS_COPIED):
+            return None
+        if not level_covers(record.get('verify', VERIFY_NONE), level):
+            return None
+        if not self.source_matches(record, entry, hash_name):
+            return None
+        if hash_name is not None and not record.get('digest'):
+            return None
+        try:
+            st = os.stat(dst)
+        except OSError:
+            return None
+        if st.st_size != entry.size or abs(st.st_mtime - entry.mtime) > MTIME_TOLERANCE:
+            return None
+        return record
+
+    def checkpoint(self, key, entry, hash_name):
+        record = self.records.get(key)
+        if record is None or record['status'] != STATUS_PARTIAL:
+            return None
+        if not self.source_matches(record, entry, hash_name):
+            return None
+        return record['offset'], record['digest']
+
+    def record_verified(self, key, entry, digest, hash_name, level):
+        # level is the verification the copy passed
+        status = STATUS_COPIED if level == VERIFY_NONE else STATUS_VERIFIED
+        self.write({'key': key, 'status': status, 'verify': level, 'size': entry.size, 'mtime': entry.mtime,
+                    'hash': hash_name, 'digest': digest})
+
+    def record_checkpoint(self, key, entry, offset, prefix_digest, hash_name):
+        self.write({'key': key, 'status': STATUS_PARTIAL, 'size': entry.size, 'mtime': entry.mtime,
+                    'hash': hash_name, 'offset': offset, 'digest': prefix_digest})
@@ -0,0 +1,300 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.copy_backends import DEFAULT_COPY_BACKEND, PROBE_SUFFIX, CopyBackendSelector
+from utils.content_store import STORE_DIRNAME
+from utils.copy_engine import CopyCancelled
+from utils.hashing import file_digest
+from utils.manifest import DriveManifest, scan_drive
+from utils.progress_bus import SpeedMeter
+from utils.run_log import RUNS_DIRNAME
+from utils.verification import MTIME_TOLERANCE, VerificationPolicy, verify_copy
+from utils.ingest_engine import EVENT_STATUS, EVENT_PROGRESS, EVENT_WARNING, EVENT_COMPLETE, format_size
+
+# Office Copy: mirror a mission folder (or a folder of missions) from the
+# field SSD to a secondary/archive drive, copying only what is new or has
+# changed. Uses the same event callback as IngestEngine.
+#
+# A target file counts as unchanged when its size matches and its mtime is
+# within MTIME_TOLERANCE. When only the mtime differs (e.g. after a copy
+# tool that did not preserve it) both files are hashed; equal digests skip
+# the copy and fix the target mtime so the next sync is decided by
+# size/mtime again. Files that only exist on the target are reported, never
+# deleted.
+#
+# The content store of a folder of missions is left out: its objects are
+# copies of mission files, linked into the later missions. Files hardlinked to each other in the
+# source (missions ingested with dedup) are copied once and linked again
+# on the target, so the archive does not grow by a copy per link.
+SYNC_WORKERS = 4
+PARTIAL_SUFFIX = '.syncpart'
+
+ACTION_NEW = 'new'
+ACTION_CHANGED = 'changed'
+ACTION_UNCHANGED = 'unchanged'
+ACTION_SAME_CONTENT = 'same_content'
+ACTION_LINKED = 'linked'
+ACTION_FAILED = 'failed'
+ACTIONS = (ACTION_NEW, ACTION_CHANGED, ACTION_UNCHANGED, ACTION_SAME_CONTENT, ACTION_LINKED, ACTION_FAILED)
+
+
+def in_store(rel_path):
+    return rel_path == STORE_DIRNAME or rel_path.startswith(STORE_DIRNAME + os.sep)
+
+
+def scan_without_store(folder):
+    manifest = scan_drive(folder)
+    return DriveManifest(manifest.root, [entry for entry in manifest if not in_store(entry.rel_path)],
+                         [rel_dir for rel_dir in manifest.directories if not in_store(rel_dir)])
+
+
+def link_groups(manifest):
+    # {rel_path of a further link: rel_path of the first link} for files
+    # hardlinked to each other within the manifest
+    first_links = {}
+    links = {}
+    for entry in manifest:
+        try:
+            st = os.stat(manifest.source_path(entry))
+        except OSError:
+            continue
+        if st.st_nlink < 2:
+            continue
+        first = first_links.setdefault((st.st_dev, st.st_ino), entry.rel_path)
+        if first != entry.rel_path:
+            links[entry.rel_path] = first
+    return links
+
+
+def needs_compare(entry, target_entry, always_digest=False):
+    # None: copy; False: unchanged; True: decide by digest
+    if target_entry is None or target_entry.size != entry.size:
+        return None
+    if always_digest:
+        return True
+    return abs(target_entry.mtime - entry.mtime) > MTIME_TOLERANCE
+
+
+class OfficeSync:
+    def __init__(self, on_event=None, workers=SYNC_WORKERS, verification_policy=None, always_digest=False,
+                 copy_backend=DEFAULT_COPY_BACKEND):
+        self.on_event = on_event
+        self.workers = workers
+        self.verification_policy = verification_policy or VerificationPolicy()
+        self.always_digest = always_digest
+        self.copy_backends = CopyBackendSelector(copy_backend)
+        self.cancel_flag = False
+        self.links_supported = True
+        self.lock = threading.Lock()
+        self.report = None
+
+    def emit(self, event, **data):
+        if self.on_event is not None:
+            self.on_event(event, data)
+
+    def update_status(self, message):
+        self.emit(EVENT_STATUS, message=message)
+
+    def cancel(self):
+        self.cancel_flag = True
+
+    def run(self, source, target):
+        # Returns the sync report, or None when cancelled
+        start_time = time.time()
+        self.update_status(f"Scanning {source}...")
+        source_manifest = scan_without_store(source)
+        links = link_groups(source_manifest)
+        target_entries = {}
+        if os.path.isdir(target):
+            self.update_status(f"Scanning {target}...")
+            target_entries = {entry.rel_path: entry for entry in scan_without_store(target)}
+
+        report = {'source': source, 'target': target, 'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                  'counts': dict.fromkeys(ACTIONS, 0), 'bytes': dict.fromkeys(ACTIONS, 0),
+                  'files': {action: [] for action in ACTIONS}, 'backends': {}}
+        self.report = report
+
+        # Unchanged files are settled here; everything else goes to the pool.
+        # Further links of a hardlinked file wait until its first link is on
+        # the target.
+        pending = []
+        linked = []
+        for entry in source_manifest:
+            target_entry = target_entries.pop(entry.rel_path, None)
+            compare = needs_compare(entry, target_entry, self.always_digest)
+            if entry.rel_path in links:
+                linked.append((entry, compare))
+            elif compare is False:
+                self.record(entry, ACTION_UNCHANGED)
+            else:
+                pending.append((entry, compare))
+        # Left-overs only exist on the target (apart from our own reports
+        # and partial files)
+        report['target_only'] = sorted(rel_path for rel_path in target_entries
+                                       if not rel_path.startswith(RUNS_DIRNAME + os.sep)
+                                       and not rel_path.endswith((PARTIAL_SUFFIX, PROBE_SUFFIX)))
+
+        os.makedirs(target, exist_ok=True)
+        for rel_dir in source_manifest.directories:
+            os.makedirs(os.path.join(target, rel_dir), exist_ok=True)
+
+        self.total_size = sum(entry.size for entry, _ in pending)
+        self.done_size = 0
+        self.speed_meter = SpeedMeter()
+        self.speed_meter.update(0)
+        logging.info(f"Sync {source} -> {target}: {len(pending)} of {len(source_manifest)} files to check or copy "
+                     f"({format_size(self.total_size)})")
+        self.update_status(f"Syncing {len(pending)} new or changed files...")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.sync_file, source_manifest, entry, target, compare)
+                       for entry, compare in pending]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except CopyCancelled:
+                    pass
+        for entry, compare in linked:
+            try:
+                self.link_file(source_manifest, entry, links[entry.rel_path], target, compare)
+            except CopyCancelled:
+                break
+
+        report['elapsed'] = time.time() - start_time
+        report['backend_probes'] = dict(self.copy_backends.probes)
+        if self.cancel_flag:
+            self.emit(EVENT_COMPLETE, report=report, cancelled=True)
+            return None
+
+        report['report_path'] = self.save_report(report)
+        failed = report['counts'][ACTION_FAILED]
+        if failed:
+            self.emit(EVENT_WARNING, title="Sync Errors",
+                      message=f"{failed} file(s) could not be copied. See copy_log.txt for details.")
+        logging.info(f"Sync completed in {report['elapsed']:.1f}s: {report['counts']}")
+        self.update_status("Sync completed.")
+        self.emit(EVENT_COMPLETE, report=report, cancelled=False)
+        return report
+
+    def sync_file(self, manifest, entry, target, compare):
+        if self.cancel_flag:
+            raise CopyCancelled()
+        src = manifest.source_path(entry)
+        dst = os.path.join(target, entry.rel_path)
+        try:
+            if compare:
+                policy = self.verification_policy
+                if file_digest(src, policy.hash_name) == file_digest(dst, policy.hash_name):
+                    # Same content; take over the source mtime so the next
+                    # sync can decide on size/mtime alone
+                    shutil.copystat(src, dst)
+                    self.record(entry, ACTION_SAME_CONTENT)
+                    return
+            action = ACTION_NEW if not os.path.exists(dst) else ACTION_CHANGED
+            backend = self.copy_file(src, dst, entry.size)
+            self.record(entry, action, backend)
+        except CopyCancelled:
+            raise
+        except Exception as e:
+            logging.error(f"Error syncing {src}: {str(e)}")
+            self.record(entry, ACTION_FAILED)
+
+    def link_file(self, manifest, entry, first_rel_path, target, compare):
+        if self.cancel_flag:
+            raise CopyCancelled()
+        dst = os.path.join(target, entry.rel_path)
+        first_dst = os.path.join(target, first_rel_path)
+        try:
+            # Only a first link that made it to the target is linked to
+            st = os.stat(first_dst) if os.path.exists(first_dst) else None
+            if st is not None and os.path.exists(dst) and os.path.samefile(dst, first_dst):
+                self.record(entry, ACTION_UNCHANGED)
+                return
+            if (self.links_supported and st is not None and st.st_size == entry.size
+                    and abs(st.st_mtime - entry.mtime) <= MTIME_TOLERANCE):
+                tmp_dst = dst + PARTIAL_SUFFIX
+                if os.path.exists(tmp_dst):
+                    os.remove(tmp_dst)
+                os.link(first_dst, tmp_dst)
+                os.replace(tmp_dst, dst)
+                self.record(entry, ACTION_LINKED)
+                return
+        except OSError as e:
+            # Target file systems without hardlinks (FAT/exFAT) get copies
+            logging.warning(f"Cannot link {dst} to {first_dst}, copying the remaining links: {str(e)}")
+            self.links_supported = False
+        if compare is False:
+            self.record(entry, ACTION_UNCHANGED)
+            return
+        with self.lock:
+            self.total_size += entry.size
+        self.sync_file(manifest, entry, target, compare)
+
+    def copy_file(self, src, dst, size):
+        # Copied under a temporary name and moved into place once verified,
+        # so an interrupted sync never leaves a truncated file that a later
+        # sync could take for complete
+        policy = self.verification_policy
+        tmp_dst = dst + PARTIAL_SUFFIX
+        try:
+            hash_name = policy.hash_name if policy.needs_source_digest else None
+            sampler = policy.sampler_for(size)
+            backend, result = self.copy_backends.copy(src, tmp_dst, size, hash_name,
+                                                      cancel_check=lambda: self.cancel_flag, sampler=sampler)
+            if not verify_copy(src, tmp_dst, policy.level, policy.hash_name, result.digest,
+                               sample_digest=sampler.digest() if sampler is not None else None):
+                raise IOError(f"Verification failed for {dst}")
+            os.replace(tmp_dst, dst)
+            return backend
+        finally:
+            if os.path.exists(tmp_dst):
+                os.remove(tmp_dst)
+
+    def record(self, entry, action, backend=None):
+        with self.lock:
+            report = self.report
+            if backend is not None:
+                report['backends'][backend] = report['backends'].get(backend, 0) + 1
+            report['counts'][action] += 1
+            report['bytes'][action] += entry.size
+            report['files'][action].append(entry.rel_path.replace(os.sep, '/'))
+            if action in (ACTION_UNCHANGED, ACTION_LINKED):
+                return
+            self.done_size += entry.size
+            done_size = self.done_size
+            speed = self.speed_meter.update(done_size)
+            eta = self.speed_meter.eta(self.total_size - done_size)
+        self.emit(EVENT_PROGRESS, percent=(done_size / self.total_size) * 100 if self.total_size > 0 else 100,
+                  operation="Syncing", current_file=entry.rel_path, copied_size=done_size,
+                  total_size=self.total_size, speed=speed, eta=eta)
+
+    def save_report(self, report):
+        folder = os.path.join(report['target'], RUNS_DIRNAME)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"sync_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return path
+
+
+def format_sync_report(report):
+    counts = report['counts']
+    sizes = report['bytes']
+    lines = [f"Copied {counts[ACTION_NEW]} new ({format_size(sizes[ACTION_NEW])}) and "
+             f"{counts[ACTION_CHANGED]} changed ({format_size(sizes[ACTION_CHANGED])}) files",
+             f"Skipped {counts[ACTION_UNCHANGED] + counts[ACTION_SAME_CONTENT]} unchanged files "
+             f"({format_size(sizes[ACTION_UNCHANGED] + sizes[ACTION_SAME_CONTENT])}), "
+             f"{counts[ACTION_SAME_CONTENT]} of them confirmed by checksum"]
+    if counts[ACTION_LINKED]:
+        lines.append(f"Linked {counts[ACTION_LINKED]} files to a copy of the same file "
+                     f"({format_size(sizes[ACTION_LINKED])} not copied again)")
+    if counts[ACTION_FAILED]:
+        lines.append(f"Failed: {counts[ACTION_FAILED]} files")
+    if report['target_only']:
+        lines.append(f"Only on the target (kept): {len(report['target_only'])} files")
+    lines.append(f"Took {report['elapsed']:.1f}s")
+    return lines
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import deque
+
+# Seconds of history behind the displayed speed and ETA
+SPEED_WINDOW = 10.0
+# Minimum spacing of the speed samples, so the window stays small however
+# many files per second are copied
+SAMPLE_INTERVAL = 0.25
+
+
+class ProgressBus:
+    # Hands engine events from the worker threads to a consumer that drains
+    # them on its own schedule (the Tk window on an after() tick). Events of
+    # the coalesced kinds only keep their latest value, so the consumer's
+    # work per tick does not grow with the number of files; all other
+    # events are delivered in order.
+    def __init__(self, coalesce=()):
+        self.coalesce = tuple(coalesce)
+        self.lock = threading.Lock()
+        self.latest = {}
+        self.events = []
+
+    def publish(self, event, data):
+        with self.lock:
+            if event in self.coalesce:
+                # Re-insert so the latest values come out in publish order
+                self.latest.pop(event, None)
+                self.latest[event] = data
+            else:
+                self.events.append((event, data))
+
+    def drain(self):
+        with self.lock:
+            latest = list(self.latest.items())
+            events = self.events
+            self.latest = {}
+            self.events = []
+        return latest + events
+
+
+class SpeedMeter:
+    # Transfer rate over the last `window` seconds instead of the whole-run
+    # average, so the ETA follows slow and fast stretches of a drive.
+    def __init__(self, window=SPEED_WINDOW, sample_interval=SAMPLE_INTERVAL):
+        self.window = window
+        self.sample_interval = sample_interval
+        self.samples = deque()
+        self.speed = 0.0
+
+    def update(self, value, now=None):
+        now = time.monotonic() if now is None else now
+        if not self.samples or now - self.samples[-1][0] >= self.sample_interval:
+            self.samples.append((now, value))
+        while len(self.samples) > 1 and now - self.samples[0][0] > self.window:
+            self.samples.popleft()
+        start_time, start_value = self.samples[0]
+        elapsed = now - start_time
+        if elapsed > 0:
+            self.speed = max(0.0, (value - start_value) / elapsed)
+        return self.speed
+
+    def eta(self, remaining):
+        return remaining / self.speed if self.speed > 0 else 0
@@ -0,0 +1,184 @@
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+
+RUNS_DIRNAME = '.copy_runs'
+
+# Per-file stages, in pipeline order. read and write overlap in the
+# pipelined copy, so the stage with the most time is the one holding the
+# copy back.
+FILE_STAGES = ('stat', 'read', 'write', 'hash', 'verify')
+STAGE_LABELS = {
+    'stat': "file system metadata (stat)",
+    'read': "source read (USB reader)",
+    'write': "destination write",
+    'hash': "hashing",
+    'verify': "verification (destination re-read)",
+}
+SLOWEST_FILES = 10
+MB = 1024 * 1024
+
+
+def bottleneck(stages):
+    stage = max(FILE_STAGES, key=lambda name: stages.get(name, 0.0))
+    return stage if stages.get(stage, 0.0) > 0 else None
+
+
+class RunLog:
+    # One JSON line per copied file with its timings, plus a summary written
+    # when the run ends. Lives in <mission>/.copy_runs next to the mission
+    # manifest; every run gets its own pair of files.
+    def __init__(self, destination, run_id=None):
+        self.run_id = run_id or time.strftime('%Y%m%d_%H%M%S')
+        folder = os.path.join(destination, RUNS_DIRNAME)
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, f"run_{self.run_id}.jsonl")
+        self.summary_path = os.path.join(folder, f"run_{self.run_id}_summary.json")
+        self.lock = threading.Lock()
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.start_time = time.time()
+        self.drives = {}
+        self.stage_totals = dict.fromkeys(FILE_STAGES, 0.0)
+        self.slowest = []
+        self.sequence = 0
+        self.probes = {}
+
+    def drive_totals(self, drive_name, device=None):
+        totals = self.drives.get(drive_name)
+        if totals is None:
+            totals = {'device': device, 'files': 0, 'bytes': 0, 'skipped': 0, 'linked': 0, 'failed': 0,
+                      'first_start': None, 'last_end': None, 'stages': dict.fromkeys(FILE_STAGES, 0.0),
+                      'backends': {}}
+            self.drives[drive_name] = totals
+        return totals
+
+    def record_file(self, record):
+        # record: drive, path, size, bytes (copied this run), device, outcome, start, elapsed and
+        # any of the FILE_STAGES durations in seconds
+        record['slowest_stage'] = bottleneck(record)
+        with self.lock:
+            self.file.write(json.dumps(record) + '\n')
+            totals = self.drive_totals(record['drive'], record.get('device'))
+            outcome = record['outcome']
+            if outcome == 'failed':
+                totals['failed'] += 1
+            elif outcome == 'skipped':
+                totals['skipped'] += 1
+            else:
+                totals['files'] += 1
+                totals['bytes'] += record['bytes']
+                if record.get('linked'):
+                    totals['linked'] += 1
+                backend = record.get('backend')
+                if backend is not None:
+                    totals['backends'][backend] = totals['backends'].get(backend, 0) + 1
+            end = record['start'] + record['elapsed']
+            if totals['first_start'] is None or record['start'] < totals['first_start']:
+                totals['first_start'] = record['start']
+            if totals['last_end'] is None or end > totals['last_end']:
+                totals['last_end'] = end
+            for stage in FILE_STAGES:
+                seconds = record.get(stage) or 0.0
+                totals['stages'][stage] += seconds
+                self.stage_totals[stage] += seconds
+            if outcome == 'copied':
+                self.sequence += 1
+                entry = (record['elapsed'], self.sequence, record)
+                if len(self.slowest) < SLOWEST_FILES:
+                    heapq.heappush(self.slowest, entry)
+                else:
+                    heapq.heappushpop(self.slowest, entry)
+
+    def record_stage(self, stage, seconds, drive_name=None):
+        # Time that is not attributable to single files, e.g. a deferred
+        # verification pass
+        with self.lock:
+            self.stage_totals[stage] += seconds
+            if drive_name is not None:
+                self.drive_totals(drive_name)['stages'][stage] += seconds
+
+    def record_probes(self, probes):
+        # Copy backend probe times per source/destination device pair
+        with self.lock:
+            self.probes.update(probes)
+
+    def summary(self):
+        with self.lock:
+            elapsed = time.time() - self.start_time
+            drives = {}
+            for drive_name, totals in self.drives.items():
+                window = 0.0
+                if totals['first_start'] is not None:
+                    window = totals['last_end'] - totals['first_start']
+                drives[drive_name] = {
+                    'device': totals['device'],
+                    'files': totals['files'],
+                    'bytes': totals['bytes'],
+                    'skipped': totals['skipped'],
+                    'linked': totals['linked'],
+                    'failed': totals['failed'],
+                    'elapsed': window,
+                    'mb_per_s': totals['bytes'] / MB / window if window > 0 else 0.0,
+                    'stages': dict(totals['stages']),
+                    'bottleneck': bottleneck(totals['stages']),
+                    'backends': dict(totals['backends']),
+                }
+            total_bytes = sum(drive['bytes'] for drive in drives.values())
+            slowest = [record for _, _, record in sorted(self.slowest, reverse=True)]
+            return {
+                'run_id': self.run_id,
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.start_time)),
+                'elapsed': elapsed,
+                'files': sum(drive['files'] for drive in drives.values()),
+                'bytes': total_bytes,
+                'mb_per_s': total_bytes / MB / elapsed if elapsed > 0 else 0.0,
+                'drives': drives,
+                'stages': dict(self.stage_totals),
+                'bottleneck': bottleneck(self.stage_totals),
+                'slowest_files': slowest,
+                'backend_probes': dict(self.probes),
+            }
+
+    def close(self):
+        summary = self.summary()
+        with self.lock:
+            self.file.close()
+        tmp_path = self.summary_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        os.replace(tmp_path, self.summary_path)
+        return summary
+
+
+def format_report(summary):
+    lines = [f"Run {summary['run_id']}: {summary['files']} files, {summary['bytes'] / MB:.1f} MB "
+             f"in {summary['elapsed']:.1f}s ({summary['mb_per_s']:.1f} MB/s)"]
+    for drive_name, drive in summary['drives'].items():
+        line = (f"  {drive_name}: {drive['files']} copied, {drive['skipped']} skipped, {drive['failed']} failed, "
+                f"{drive['mb_per_s']:.1f} MB/s")
+        if drive['bottleneck']:
+            line += f", limited by {STAGE_LABELS[drive['bottleneck']]}"
+        if drive.get('backends'):
+            line += ", copied with " + ", ".join(f"{name} ({count})" for name, count in drive['backends'].items())
+        lines.append(line)
+    stages = summary['stages']
+    busy = sum(stages.values())
+    if busy > 0:
+        lines.append("  Time per stage: " + ", ".join(f"{stage} {stages[stage]:.1f}s ({stages[stage] / busy:.0%})"
+                                                      for stage in FILE_STAGES))
+    if summary['bottleneck']:
+        lines.append(f"  Bottleneck: {STAGE_LABELS[summary['bottleneck']]}")
+    if summary['slowest_files']:
+        lines.append("  Slowest files:")
+        for record in summary['slowest_files']:
+            lines.append(f"    {record['drive']}/{record['path']}: {record['elapsed']:.2f}s, "
+                         f"{record['bytes'] / MB:.1f} MB, slowest stage {record.get('slowest_stage')}")
+    return lines
+
+
+def log_report(summary):
+    for line in format_report(summary):
+        logging.info(line)
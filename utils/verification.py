@@ -0,0 +1,249 @@
+import logging
+import os
+import queue
+
+from utils.hashing import CHUNK_SIZE, new_hasher
+
+VERIFY_NONE = 'none'
+VERIFY_SIZE_MTIME = 'size_mtime'
+VERIFY_SAMPLED = 'sampled'
+VERIFY_FULL = 'full'
+VERIFY_LEVELS = (VERIFY_NONE, VERIFY_SIZE_MTIME, VERIFY_SAMPLED, VERIFY_FULL)
+DEFAULT_VERIFY_LEVEL = VERIFY_FULL
+
+# Sampled verification compares this many evenly spaced blocks (always
+# including the first and last block) instead of the whole file.
+SAMPLE_BLOCKS = 16
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+# FAT/exFAT store mtimes with 2 second resolution
+MTIME_TOLERANCE = 2.0
+
+
+def level_covers(level, required):
+    # Whether a copy checked at `level` was checked at least as thoroughly
+    # as `required` asks for
+    return VERIFY_LEVELS.index(level) >= VERIFY_LEVELS.index(required)
+
+
+def drop_file_cache(file_path):
+    # Best effort: ask the OS to evict the file from the page cache so the
+    # next read really comes from the disk. Dirty pages cannot be dropped,
+    # so flush them first.
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+
+def open_uncached(file_path):
+    f = open(file_path, 'rb', buffering=0)
+    try:
+        import fcntl
+        if hasattr(fcntl, 'F_NOCACHE'):  # macOS
+            fcntl.fcntl(f.fileno(), fcntl.F_NOCACHE, 1)
+    except (ImportError, OSError):
+        pass
+    return f
+
+
+def destination_digest(file_path, hash_name, bypass_cache=False):
+    if bypass_cache:
+        drop_file_cache(file_path)
+        f = open_uncached(file_path)
+    else:
+        f = open(file_path, 'rb', buffering=0)
+    hasher = new_hasher(hash_name)
+    buf = bytearray(CHUNK_SIZE)
+    view = memoryview(buf)
+    with f:
+        while True:
+            n = f.readinto(view)
+            if not n:
+                break
+            hasher.update(view[:n])
+    return hasher.hexdigest()
+
+
+def sample_offsets(size):
+    if size <= SAMPLE_BLOCKS * SAMPLE_BLOCK_SIZE:
+        return [0]
+    last = size - SAMPLE_BLOCK_SIZE
+    step = last / (SAMPLE_BLOCKS - 1)
+    return sorted({int(i * step) for i in range(SAMPLE_BLOCKS)} | {last})
+
+
+def sample_ranges(size):
+    # (start, end) of the compared blocks; small files are compared
+    # completely (a single "sample" of the whole file)
+    block_size = SAMPLE_BLOCK_SIZE if size > SAMPLE_BLOCKS * SAMPLE_BLOCK_SIZE else size
+    return [(offset, offset + block_size) for offset in sample_offsets(size) if block_size]
+
+
+class SourceSampler:
+    # Hashes the sampled blocks of the source while the copy reads it, so
+    # sampled verification only has to read the destination. Must be fed
+    # the whole file in order; digest() is None otherwise (a resumed copy,
+    # a backend that copies outside Python) and the source is read again.
+    def __init__(self, size, hash_name):
+        self.size = size
+        self.ranges = sample_ranges(size)
+        self.hasher = new_hasher(hash_name)
+        self.index = 0
+        self.position = 0
+        self.complete = True
+
+    def update(self, offset, data):
+        if offset != self.position:
+            self.complete = False
+        if not self.complete:
+            return
+        end = offset + len(data)
+        while self.index < len(self.ranges):
+            start, stop = self.ranges[self.index]
+            if start >= end:
+                break
+            if stop > offset:
+                self.hasher.update(data[max(start, offset) - offset:min(stop, end) - offset])
+            if stop > end:
+                break
+            self.index += 1
+        self.position = end
+
+    def digest(self):
+        if not self.complete or self.position != self.size:
+            return None
+        return self.hasher.hexdigest()
+
+
+def destination_sample_digest(file_path, size, hash_name, bypass_cache=False):
+    hasher = new_hasher(hash_name)
+    with (open_uncached(file_path) if bypass_cache else open(file_path, 'rb')) as f:
+        for start, stop in sample_ranges(size):
+            f.seek(start)
+            hasher.update(f.read(stop - start))
+    return hasher.hexdigest()
+
+
+def verify_sampled(src, dst, bypass_cache=False, sample_digest=None, hash_name=None):
+    size = os.path.getsize(src)
+    if os.path.getsize(dst) != size:
+        return False
+    if bypass_cache:
+        drop_file_cache(dst)
+    if sample_digest is not None:
+        return destination_sample_digest(dst, size, hash_name, bypass_cache) == sample_digest
+    with open(src, 'rb') as fs, (open_uncached(dst) if bypass_cache else open(dst, 'rb')) as fd:
+        for start, stop in sample_ranges(size):
+            fs.seek(start)
+            fd.seek(start)
+            if fs.read(stop - start) != fd.read(stop - start):
+                return False
+    return True
+
+
+def verify_size_mtime(src, dst):
+    src_stat = os.stat(src)
+    dst_stat = os.stat(dst)
+    return (src_stat.st_size == dst_stat.st_size
+            and abs(src_stat.st_mtime - dst_stat.st_mtime) <= MTIME_TOLERANCE)
+
+
+def verify_copy(src, dst, level, hash_name=None, source_digest=None, bypass_cache=False, sample_digest=None):
+    # sample_digest is the SourceSampler digest of the copy, if it has one
+    if level == VERIFY_NONE:
+        return True
+    if level == VERIFY_SIZE_MTIME:
+        return verify_size_mtime(src, dst)
+    if level == VERIFY_SAMPLED:
+        return verify_sampled(src, dst, bypass_cache, sample_digest, hash_name)
+    if level == VERIFY_FULL:
+        if source_digest is None:
+            raise ValueError("Full verification needs the source digest")
+        if os.path.getsize(dst) != os.path.getsize(src):
+            return False
+        return destination_digest(dst, hash_name, bypass_cache) == source_digest
+    raise ValueError(f"Unknown verification level: {level}")
+
+
+class VerificationPolicy:
+    def __init__(self, level=DEFAULT_VERIFY_LEVEL, hash_name='md5', deferred=False):
+        if level not in VERIFY_LEVELS:
+            raise ValueError(f"Unknown verification level: {level}")
+        new_hasher(hash_name)  # fail early on an unavailable algorithm
+        self.level = level
+        self.hash_name = hash_name
+        self.deferred = deferred
+
+    @property
+    def needs_source_digest(self):
+        return self.level == VERIFY_FULL
+
+    def sampler_for(self, size):
+        # A SourceSampler for a copy of size bytes, when sampled
+        # verification is going to need one
+        return SourceSampler(size, self.hash_name) if self.level == VERIFY_SAMPLED else None
+
+    @property
+    def confirms_copies(self):
+        # Whether a copy that passed is checked well enough to delete the
+        # source file afterwards: its data must have been read back. Size
+        # and mtime prove nothing, copystat sets the mtime itself.
+        return self.level in (VERIFY_SAMPLED, VERIFY_FULL)
+
+    @property
+    def reads_destination(self):
+        return self.level in (VERIFY_SAMPLED, VERIFY_FULL)
+
+    def __repr__(self):
+        return f"VerificationPolicy(level={self.level!r}, hash_name={self.hash_name!r}, deferred={self.deferred})"
+
+
+class DeferredVerifier:
+    # Collects finished copies and re-reads the destinations in a single
+    # background pass once copying is done. By then most of the written data
+    # has left the page cache, and the cache is dropped explicitly per file
+    # where the OS allows it, so the check actually reads back from disk.
+    def __init__(self, policy):
+        self.policy = policy
+        self.pending = queue.Queue()
+
+    def add(self, src, dst, source_digest=None, tag=None, sample_digest=None):
+        self.pending.put((src, dst, source_digest, tag, sample_digest))
+
+    def __len__(self):
+        return self.pending.qsize()
+
+    def run(self, on_progress=None, cancel_check=None, on_verified=None):
+        failures = []
+        total = self.pending.qsize()
+        done = 0
+        while True:
+            try:
+                src, dst, source_digest, tag, sample_digest = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            if cancel_check is not None and cancel_check():
+                break
+            try:
+                ok = verify_copy(src, dst, self.policy.level, self.policy.hash_name, source_digest, bypass_cache=True,
+                                 sample_digest=sample_digest)
+            except Exception as e:
+                logging.error(f"Error verifying {dst}: {str(e)}")
+                ok = False
+            if not ok:
+                failures.append((src, dst, tag))
+            elif on_verified is not None:
+                on_verified(src, dst, tag)
+            done += 1
+            if on_progress is not None:
+                on_progress(done, total, dst)
+        return failures
+